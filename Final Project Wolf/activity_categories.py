@@ -0,0 +1,48 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+
+# Keyword lists of each activity type, in priority order: a description that
+# contains keywords of several types gets the first of those types
+ACTIVITY_KEYWORDS = [
+    ('Creative', ['create', 'modify', 'delete', 'assign material', 'insert', 'comment', 'rename']),
+    ('Viewing', ['open', 'close', 'view']),
+    ('Administrative', ['import', 'export', 'transfer', 'copy']),
+]
+ACTIVITY_TYPES = [name for name, _ in ACTIVITY_KEYWORDS] + ['Other']
+
+# All keyword lists compiled into one pattern. The lookahead makes finditer
+# report every position where any keyword starts (overlapping ones included);
+# the named group says which type the keyword belongs to.
+_KEYWORD_PATTERN = re.compile('(?=(?:' + '|'.join(
+    f"(?P<{name}>{'|'.join(re.escape(keyword) for keyword in keywords)})"
+    for name, keywords in ACTIVITY_KEYWORDS
+) + '))')
+_PRIORITY = {name: i for i, name in enumerate(ACTIVITY_TYPES)}
+
+
+# Categorize activities
+@lru_cache(maxsize=65536)
+def categorize_activity(description):
+    best = 'Other'
+    for match in _KEYWORD_PATTERN.finditer(description.lower()):
+        if _PRIORITY[match.lastgroup] < _PRIORITY[best]:
+            best = match.lastgroup
+            if best == ACTIVITY_TYPES[0]:
+                break
+    return best
+
+
+# Activity type of every row of a Description column, as a categorical. Each
+# distinct description is categorized once; missing ones are 'Other'.
+def categorize_column(descriptions):
+    if not isinstance(descriptions.dtype, pd.CategoricalDtype):
+        descriptions = descriptions.astype('category')
+    # The extra last slot is hit by code -1 (missing description)
+    type_codes = np.array([_PRIORITY[categorize_activity(str(description))]
+                           for description in descriptions.cat.categories] + [_PRIORITY['Other']], dtype=np.int8)
+    activity_types = pd.Categorical.from_codes(type_codes[descriptions.cat.codes.to_numpy()], categories=ACTIVITY_TYPES)
+    return pd.Series(activity_types, index=descriptions.index, name='ActivityType')
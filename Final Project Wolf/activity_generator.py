@@ -0,0 +1,162 @@
+import argparse
+import json
+import os
+import string
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+
+from activity_schema import TIME_FORMAT
+
+
+# Synthetic Onshape activity logs for benchmarks, from a few thousand rows to
+# millions. The vocabulary is learned from the committed exports: the same
+# descriptions and tab names at the same frequencies, with the user names in
+# descriptions ("Tab Assembly 1 of type ASSEMBLY opened by StudentA") replaced
+# by the generated user. Rows come in work sessions of each team: a session
+# starts at an hour of the week drawn from the samples' hour-of-week profile
+# and its actions follow each other a few seconds to minutes apart. Records
+# are newest first, like the exports.
+#
+#   python activity_generator.py --rows 1000000 --out generated.json
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_PATHS = [os.path.join(APP_DIR, 'test json.json'), os.path.join(APP_DIR, 'Team Wolf Jason .json')]
+
+# First day of the generated term, and its length
+TERM_START = datetime(2022, 10, 30)
+TERM_DAYS = 16 * 7
+
+# Size of a team's log (the samples have 1.6k and 10k rows), students in a
+# team, actions in a work session and seconds between two actions, on average
+TEAM_ROWS = 10000
+TEAM_USERS = 4
+SESSION_ACTIONS = 60
+ACTION_SECONDS = 20
+
+USER_PLACEHOLDER = '\0'
+
+# Records turned into dicts at a time
+CHUNK_ROWS = 100000
+
+
+# Descriptions (as templates with USER_PLACEHOLDER for the acting user) with
+# the tab they happened in, their frequencies, the documents, and the
+# frequency of each hour of the week in the sample logs
+class Vocabulary:
+    def __init__(self, paths=SAMPLE_PATHS):
+        events = Counter()
+        hours = np.zeros(7 * 24)
+        self.documents = []
+        for path in paths:
+            with open(path, 'r', encoding='utf-8-sig') as f:
+                records = json.load(f)
+            for record in records:
+                user = record.get('User') or ''
+                description = record.get('Description') or ''
+                if user:
+                    description = description.replace(user, USER_PLACEHOLDER)
+                events[record.get('Tab'), description] += 1
+                time = datetime.strptime(record['Time'], TIME_FORMAT)
+                hours[time.weekday() * 24 + time.hour] += 1
+                if record.get('Document') not in self.documents:
+                    self.documents.append(record.get('Document'))
+        self.events = list(events)
+        self.event_weights = np.array(list(events.values()), dtype=float)
+        self.event_weights /= self.event_weights.sum()
+        # Every hour of the week stays possible, if rarely
+        hours += 0.05 * hours.mean()
+        self.hour_weights = hours / hours.sum()
+
+
+def user_name(number):
+    letters = ''
+    number += 1
+    while number:
+        number, letter = divmod(number - 1, 26)
+        letters = string.ascii_uppercase[letter] + letters
+    return 'Student' + letters
+
+
+# The Time (seconds since the epoch), team and user of every row, newest first
+def generate_times(rows, vocabulary, rng):
+    teams = max(1, round(rows / TEAM_ROWS))
+    sessions = max(1, -(-rows // SESSION_ACTIONS))
+    session_team = rng.integers(0, teams, sessions)
+    session_user = session_team * TEAM_USERS + rng.integers(0, TEAM_USERS, sessions)
+    week_hour = rng.choice(7 * 24, sessions, p=vocabulary.hour_weights)
+    week = rng.integers(0, TERM_DAYS // 7, sessions)
+    # TERM_START is a Sunday: hour-of-week 0 (Monday 00:00) is one day later
+    term_start = int((TERM_START - datetime(1970, 1, 1)).total_seconds())
+    start = term_start + 86400 + week * 7 * 86400 + week_hour * 3600 + rng.integers(0, 3600, sessions)
+
+    # Rows dealt to sessions at random, then spread out in time within each one
+    session = np.sort(rng.integers(0, sessions, rows))
+    first = np.searchsorted(session, np.arange(sessions))
+    gaps = rng.exponential(ACTION_SECONDS, rows)
+    elapsed = np.cumsum(gaps)
+    elapsed -= elapsed[first[session]] - gaps[first[session]]
+    times = start[session] + elapsed.astype(np.int64)
+
+    order = np.argsort(-times, kind='stable')
+    return times[order].astype(np.int64), session_team[session][order], session_user[session][order]
+
+
+# Records of a generated log, a chunk of dicts at a time (seed gives the same log again)
+def iter_records(rows, seed=0, vocabulary=None, chunk_rows=CHUNK_ROWS):
+    vocabulary = Vocabulary() if vocabulary is None else vocabulary
+    rng = np.random.default_rng(seed)
+    times, teams, users = generate_times(rows, vocabulary, rng)
+    events = rng.choice(len(vocabulary.events), rows, p=vocabulary.event_weights)
+    # The sample documents, then numbered copies of them for further teams
+    documents = []
+    for team in range(int(teams.max()) + 1):
+        document = vocabulary.documents[team % len(vocabulary.documents)]
+        documents.append(document if team < len(vocabulary.documents) else f"{document} {team + 1}")
+    user_names = [user_name(user) for user in range(int(users.max()) + 1)]
+
+    for start in range(0, rows, chunk_rows):
+        stop = min(start + chunk_rows, rows)
+        time_texts = np.datetime_as_string(times[start:stop].astype('datetime64[s]'), unit='s')
+        chunk = []
+        for time, team, user, event in zip(time_texts.tolist(), teams[start:stop].tolist(),
+                                           users[start:stop].tolist(), events[start:stop].tolist()):
+            tab, description = vocabulary.events[event]
+            name = user_names[user]
+            chunk.append({'Time': time.replace('T', ' '), 'Document': documents[team], 'Tab': tab,
+                          'User': name, 'Description': description.replace(USER_PLACEHOLDER, name)})
+        yield chunk
+
+
+# A generated log as one list of records
+def generate_records(rows, seed=0, vocabulary=None):
+    records = []
+    for chunk in iter_records(rows, seed, vocabulary):
+        records.extend(chunk)
+    return records
+
+
+# Write a generated log as a JSON array, one record per line like the exports
+def write_json(path, rows, seed=0):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        separator = ''
+        for chunk in iter_records(rows, seed):
+            for record in chunk:
+                f.write(separator + json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+                separator = ',\n'
+        f.write(']\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Onshape activity log")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='generated.json')
+    args = parser.parse_args()
+    write_json(args.out, args.rows, args.seed)
+    print(f"{args.rows} records written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
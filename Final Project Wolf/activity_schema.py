@@ -0,0 +1,123 @@
+import math
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+
+# Format of the "Time" field in the Onshape activity exports
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Fields every activity table has, whatever the records contained. A record
+# without one of them gets a missing value, which the screens already treat as
+# "Unknown" (counts) or as matching (filters).
+TEXT_COLUMNS = ['Document', 'Tab', 'User', 'Description']
+EXPECTED_COLUMNS = ['Time'] + TEXT_COLUMNS
+
+# Years datetime64[ns] can hold
+_MIN_YEAR = 1678
+_MAX_YEAR = 2261
+
+
+# Outcome of validating the records of one dataset: how many were read and
+# kept, how many of each field were missing, and why rows were rejected, with
+# the first few rejected rows as examples.
+class ValidationReport:
+    MAX_SAMPLES = 20
+
+    def __init__(self):
+        self.rows_read = 0
+        self.rows_kept = 0
+        self.missing = Counter()
+        self.rejected = Counter()
+        self.samples = []
+
+    @property
+    def rows_rejected(self):
+        return self.rows_read - self.rows_kept
+
+    def reject(self, rows, reason, values):
+        self.rejected[reason] += len(rows)
+        for row, value in zip(rows, values):
+            if len(self.samples) >= self.MAX_SAMPLES:
+                break
+            self.samples.append({'Record': int(row) + 1, 'Reason': reason, 'Value': repr(value)[:200]})
+
+    # The sample rejected records, in file order (1-based record numbers)
+    def sample_rows(self):
+        return sorted(self.samples, key=lambda sample: sample['Record'])
+
+
+# Parse the Time values in one call to pandas' fixed-format parser (compiled,
+# no per-row strptime), to datetime64[ns]. Missing values and empty strings give
+# NaT; returns the times and a mask of the values that are present but are not
+# timestamps in TIME_FORMAT (or fall outside the datetime64[ns] range).
+def parse_times(values):
+    values = pd.Series(values, dtype=object)
+    missing = (values.isna() | (values == '')).to_numpy()
+    times = pd.to_datetime(values, format=TIME_FORMAT, errors='coerce')
+    out_of_range = (times.dt.year < _MIN_YEAR) | (times.dt.year > _MAX_YEAR)
+    if out_of_range.any():
+        times = times.mask(out_of_range)
+    times = times.to_numpy(dtype='datetime64[ns]')
+    return times, np.isnat(times) & ~missing
+
+
+def _as_text(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return str(value)
+
+
+# One pass of validation and normalization over a batch of records, giving a
+# DataFrame every later stage can rely on:
+#
+# - every EXPECTED_COLUMNS field exists (first, in that order), and the kept
+#   rows missing each one are counted in the report;
+# - Time is datetime64, parsed once here;
+# - the text fields hold strings (numbers and other values are converted);
+# - records that are not objects, or whose Time is present but not a valid
+#   timestamp, are dropped and listed in the report.
+#
+# first_row is the position of the first record in the whole dataset, so the
+# report numbers records the same way when a stream is validated in chunks.
+def normalize_records(records, report=None, first_row=0):
+    if report is None:
+        report = ValidationReport()
+    if not isinstance(records, list):
+        records = list(records)
+    report.rows_read += len(records)
+
+    rows = np.arange(first_row, first_row + len(records))
+    is_object = np.fromiter((isinstance(record, dict) for record in records), dtype=bool, count=len(records))
+    if not is_object.all():
+        report.reject(rows[~is_object], 'not a JSON object', [records[i] for i in np.flatnonzero(~is_object)])
+        records = [record for record in records if isinstance(record, dict)]
+        rows = rows[is_object]
+
+    table = pd.DataFrame.from_records(records) if records else pd.DataFrame(index=range(0))
+    for column in EXPECTED_COLUMNS:
+        if column not in table.columns:
+            table[column] = pd.Series([None] * len(table), dtype=object)
+    # Expected fields first, in a fixed order, then any others as they appear
+    table = table.reindex(columns=EXPECTED_COLUMNS + [column for column in table.columns
+                                                      if column not in EXPECTED_COLUMNS])
+
+    for column in TEXT_COLUMNS:
+        if pd.api.types.infer_dtype(table[column], skipna=True) not in ('string', 'empty'):
+            # Converted from the records, as pandas may have turned ints into floats
+            table[column] = pd.Series([_as_text(record.get(column)) for record in records], dtype=object)
+
+    times, invalid = parse_times(table['Time'])
+    if invalid.any():
+        report.reject(rows[invalid], 'invalid Time', table['Time'][invalid].tolist())
+        table = table[~invalid].reset_index(drop=True)
+        times = times[~invalid]
+    table['Time'] = times
+
+    for column in EXPECTED_COLUMNS:
+        report.missing[column] += int(table[column].isna().sum())
+    report.rows_kept += len(table)
+    return table
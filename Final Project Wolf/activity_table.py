@@ -0,0 +1,101 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from activity_categories import categorize_column
+from activity_schema import TIME_FORMAT, normalize_records
+
+# Low-cardinality text columns, stored dictionary-encoded (one copy of each
+# distinct string plus a small integer code per row)
+CATEGORICAL_COLUMNS = ['User', 'Document', 'Tab', 'Description']
+
+# Records turned into a table at a time when building from a stream
+CHUNK_ROWS = 50000
+
+
+# Turn a list of activity records into the columnar table shared by all screens.
+# Runs once per dataset; screens slice this table instead of rebuilding
+# DataFrames and reparsing timestamps on every rerun. The records are validated
+# and normalized first (see activity_schema), so the table always has the Time,
+# Document, Tab, User and Description columns with Time parsed; rejected
+# records are counted in report.
+def build_activity_table(records, report=None, first_row=0):
+    table = normalize_records(records, report, first_row)
+    for column in CATEGORICAL_COLUMNS:
+        table[column] = table[column].astype('category')
+    # Classified once here; charts and the chatbot read this column
+    table['ActivityType'] = categorize_column(table['Description'])
+    return table
+
+
+# Same table as build_activity_table, from an iterable of records consumed
+# CHUNK_ROWS at a time: only one chunk of record dicts exists at once, next to
+# the (much smaller) columnar chunks built so far.
+def build_activity_table_chunked(records, report=None, chunk_rows=CHUNK_ROWS):
+    tables = []
+    chunk = []
+    first_row = 0
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == chunk_rows:
+            tables.append(build_activity_table(chunk, report, first_row))
+            first_row += len(chunk)
+            chunk = []
+    if chunk or not tables:
+        tables.append(build_activity_table(chunk, report, first_row))
+    return concat_activity_tables(tables)
+
+
+# Concatenate activity tables, merging the categories of the categorical
+# columns instead of falling back to object columns
+def concat_activity_tables(tables):
+    if len(tables) == 1:
+        return tables[0]
+    # Fields in the order they first appear, ActivityType (added after them) last
+    columns = [column for column in dict.fromkeys(column for t in tables for column in t.columns)
+               if column != 'ActivityType'] + ['ActivityType']
+    categorical = CATEGORICAL_COLUMNS + ['ActivityType']
+    table = pd.concat([t.drop(columns=categorical) for t in tables], ignore_index=True)
+    for column in categorical:
+        parts = [t[column].array for t in tables]
+        categories = parts[0].categories
+        if not all(part.categories.equals(categories) for part in parts):
+            # Merged and sorted like astype('category') sorts them
+            categories = pd.Index(list(dict.fromkeys(value for part in parts for value in part.categories)))
+            try:
+                categories = categories.sort_values()
+            except TypeError:
+                pass
+        codes = []
+        for part in parts:
+            # Map each part's codes onto the merged categories (-1 stays missing)
+            mapping = np.append(categories.get_indexer(part.categories), -1)
+            codes.append(mapping[part.codes])
+        table[column] = pd.Categorical.from_codes(np.concatenate(codes), categories=categories)
+    return table.reindex(columns=columns)
+
+
+# One table of several datasets, with a categorical Source column saying which
+# dataset (file) each row comes from. Names that repeat get a number appended.
+def union_activity_tables(tables, names):
+    sources = []
+    for name in names:
+        source, number = name, 2
+        while source in sources:
+            source, number = f"{name} ({number})", number + 1
+        sources.append(source)
+    table = concat_activity_tables(list(tables))
+    codes = np.repeat(np.arange(len(tables)), [len(t) for t in tables])
+    table.insert(0, 'Source', pd.Categorical.from_codes(codes, categories=sources))
+    return table
+
+
+# Counter of the values of a column, with missing values counted as 'Unknown'
+def column_counts(table, column):
+    counts = table[column].value_counts(sort=False, dropna=False)
+    result = Counter()
+    for value, count in counts.items():
+        if count:
+            result['Unknown' if pd.isna(value) else value] += int(count)
+    return result
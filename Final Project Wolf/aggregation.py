@@ -0,0 +1,66 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+
+# Worker processes for aggregations over large tables (every core unless the
+# AGGREGATION_WORKERS environment variable says otherwise), and the row count
+# below which aggregations run in the calling thread: for small tables,
+# sending the chunks to other processes costs more than counting them.
+WORKERS = int(os.environ.get('AGGREGATION_WORKERS') or os.cpu_count() or 1)
+PARALLEL_MIN_ROWS = int(os.environ.get('AGGREGATION_MIN_ROWS') or 500000)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+# One pool per worker count, started on first use and kept for the life of the
+# server. Workers are spawned rather than forked, as the Streamlit server
+# process runs many threads.
+def get_pool(workers):
+    with _pools_lock:
+        if workers not in _pools:
+            _pools[workers] = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pools[workers]
+
+
+def _discard_pool(workers):
+    with _pools_lock:
+        pool = _pools.pop(workers, None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# The table (or its rows with the given ids) cut into about equal runs of rows
+def split_rows(table, parts, rows=None):
+    n_rows = len(table) if rows is None else len(rows)
+    bounds = np.linspace(0, n_rows, parts + 1).astype(int)
+    return [table.iloc[start:stop] if rows is None else table.iloc[rows[start:stop]]
+            for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+
+# Map-reduce over the rows of a table. count(chunk) aggregates a run of rows
+# and merge(partials) combines those results into one of the same form, so
+# that merge([count(a), count(b)]) == count(a + b). Large tables are split into
+# one chunk per worker and counted in the process pool; small ones (or
+# workers=1) are counted directly in this thread. count and merge must be
+# module-level functions so they can be sent to the workers. With row ids,
+# only those rows are counted; each chunk is then a temporary copy of its rows.
+def map_reduce(table, count, merge, workers=None, min_rows=None, rows=None):
+    workers = WORKERS if workers is None else workers
+    min_rows = PARALLEL_MIN_ROWS if min_rows is None else min_rows
+    n_rows = len(table) if rows is None else len(rows)
+    if workers <= 1 or n_rows < max(min_rows, 2):
+        return count(table if rows is None else table.iloc[rows])
+    try:
+        partials = list(get_pool(workers).map(count, split_rows(table, workers, rows)))
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory): start a new pool next time
+        # and count this table here
+        _discard_pool(workers)
+        return count(table if rows is None else table.iloc[rows])
+    return merge(partials)
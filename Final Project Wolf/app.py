@@ -1,143 +1,80 @@
 from re import T
 import streamlit as st
-import pandas as pd
 import json
-import io
+import os
 from datetime import datetime, date
-import matplotlib.pyplot as plt
-import seaborn as sns
-from io import BytesIO
-import base64
-import nltk
-from nltk.chat.util import Chat, reflections
 import requests
-from collections import Counter
-
-# Download necessary NLTK data
-nltk.download('punkt')
-nltk.download('wordnet')
-
-# Fetch data from Firebase
-firebase_url = 'https://hw02-fe51f-default-rtdb.europe-west1.firebasedatabase.app/.json'
-
-#json's firebase
-firebase_history_url = 'https://hw03-16951-default-rtdb.europe-west1.firebasedatabase.app/.json'
-
-response = requests.get(firebase_url)
-data = response.json()
-
-# Check the structure of the data and extract the list of activities
-if isinstance(data, dict):
-    for key in data.keys():
-        if isinstance(data[key], list):
-            data = data[key]
-            break
-    else:
-        data = None
-
-if data is None:
-    st.error("Unexpected data structure from Firebase")
-    users = Counter()
-    documents = Counter()
-    tabs = Counter()
-    descriptions = Counter()
-    activities = Counter()
-    total_actions = 0
-    unique_users = 0
-    unique_documents = 0
-    unique_tabs = 0
-else:
-    # Process the data
-    users = Counter([item.get('User', 'Unknown') for item in data])
-    documents = Counter([item.get('Document', 'Unknown') for item in data])
-    tabs = Counter([item.get('Tab', 'Unknown') for item in data])
-    descriptions = Counter([item.get('Description', 'Unknown') for item in data])
-
-    # Calculate some statistics
-    total_actions = len(data)
-    unique_users = len(users)
-    unique_documents = len(documents)
-    unique_tabs = len(tabs)
-
-    # Categorize activities
-    def categorize_activity(description):
-        creative_keywords = ['create', 'modify', 'delete', 'assign material', 'insert', 'comment', 'rename']
-        viewing_keywords = ['open', 'close', 'view']
-        administrative_keywords = ['import', 'export', 'transfer', 'copy']
-
-        if any(keyword in description.lower() for keyword in creative_keywords):
-            return 'Creative'
-        elif any(keyword in description.lower() for keyword in viewing_keywords):
-            return 'Viewing'
-        elif any(keyword in description.lower() for keyword in administrative_keywords):
-            return 'Administrative'
+from firebase_loader import CachedFirebaseLoader
+import history_store
+from budget_cache import BudgetLRUCache
+import instrumentation
+from instrumentation import span
+
+# pandas, matplotlib and seaborn are imported by the screens and cached builders
+# that use them (activity_table, filter_engine, stats_cube, chat_engine, charts),
+# so the Admin page starts and reruns without loading them
+
+# Fetch data from Firebase (FIREBASE_URL points it at another database, e.g. fake_firebase.py)
+firebase_url = os.environ.get('FIREBASE_URL') or 'https://hw02-fe51f-default-rtdb.europe-west1.firebasedatabase.app/.json'
+
+#json's firebase (database root, the history_store module adds the node paths; FIREBASE_HISTORY_URL overrides it)
+firebase_history_url = (os.environ.get('FIREBASE_HISTORY_URL')
+                        or 'https://hw03-16951-default-rtdb.europe-west1.firebasedatabase.app')
+
+# How long the cached Firebase activity data is served before it is revalidated
+FIREBASE_TTL_SECONDS = 60
+FIREBASE_SNAPSHOT_PATH = (os.environ.get('FIREBASE_SNAPSHOT_PATH')
+                          or os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'firebase_activity.json'))
+
+# Most uploads downloaded at the same time when several files are selected
+MAX_PARALLEL_DOWNLOADS = 8
+
+# Memory budget of the rendered chart cache
+CHART_CACHE_BYTES = 64 * 1024 * 1024
+
+# Memory budget of the generated export file cache
+EXPORT_CACHE_BYTES = 128 * 1024 * 1024
+
+# Show the timings panel in the sidebar. It shows the timings of every session,
+# so it is only on when the server is started with APP_DEBUG_PANEL set.
+DEBUG_PANEL = bool(os.environ.get('APP_DEBUG_PANEL'))
+
+# Memory budget of the parsed dataset tables shared by all sessions (1 GB
+# unless the DATASET_CACHE_BYTES environment variable says otherwise)
+DATASET_CACHE_BYTES = int(os.environ.get('DATASET_CACHE_BYTES') or 1024 * 1024 * 1024)
+
+# The list of activities in the Firebase data (None when it has another shape)
+def firebase_activities(data):
+    # Check the structure of the data and extract the list of activities
+    if isinstance(data, dict):
+        for key in data.keys():
+            if isinstance(data[key], list):
+                data = data[key]
+                break
         else:
-            return 'Other'
-
-    activities = Counter([categorize_activity(item.get('Description', '')) for item in data])
-
-# Define patterns and responses
-patterns = [
-    (r'hi|hello|hey', ['Hello!', 'Hi there!', 'Welcome to the project management assistant.']),
-    (r'how are you?', ['I\'m functioning well, thank you!', 'I\'m operational and ready to assist with your project management.']),
-    (r'what is your name?', ['I\'m the Project Management Assistant.', 'You can call me the Assistant.']),
-    (r'what are the main activities of the student?', [f"The main activities are: {activities['Creative']} creative actions, {activities['Viewing']} viewing actions, and {activities['Administrative']} administrative actions."]),
-    (r'are they creative?', [f"Yes, the student has performed {activities['Creative']} creative actions."]),
-    (r'are they viewing?', [f"Yes, the student has performed {activities['Viewing']} viewing actions."]),
-    (r'are they administrative?', [f"Yes, the student has performed {activities['Administrative']} administrative actions."]),
-    (r'how many creative actions?', [f"The student has performed {activities['Creative']} creative actions."]),
-    (r'how many viewing actions?', [f"The student has performed {activities['Viewing']} viewing actions."]),
-    (r'how many administrative actions?', [f"The student has performed {activities['Administrative']} administrative actions."]),
-    (r'exit|bye|goodbye', ['Thank you for using the Project Management Assistant. Goodbye!', 'Farewell! Don\'t hesitate to return if you need more assistance with your project.']),
-    (r'what documents were accessed?', [f"The documents accessed were: {', '.join(documents.keys())}"]),
-    (r'what tabs were used?', [f"The tabs used were: {', '.join(tabs.keys())}"]),
-    (r'how many times was the document opened?', [f"The document was opened {descriptions['Open document']} times."]),
-    (r'how many times was the document closed?', [f"The document was closed {descriptions['Close document']} times."]),
-    (r'how many comments were made?', [f"{descriptions['Comment on a Document']} comments were made."]),
-    (r'how many users interacted with the document?', [f"{unique_users} unique users interacted with the document."]),
-]
-
-# Create a chatbot
-chatbot = Chat(patterns, reflections)
-
-def initialize_chatbot(json_data):
-    # Process the data to extract relevant information for the chatbot
-    users = Counter([item.get('User', 'Unknown') for item in json_data])
-    documents = Counter([item.get('Document', 'Unknown') for item in json_data])
-    tabs = Counter([item.get('Tab', 'Unknown') for item in json_data])
-    descriptions = Counter([item.get('Description', 'Unknown') for item in json_data])
-
-    total_actions = len(json_data)
-    unique_users = len(users)
-    unique_documents = len(documents)
-    unique_tabs = len(tabs)
-
-    activities = Counter([categorize_activity(item.get('Description', '')) for item in json_data])
-
-    # Define patterns and responses
-    patterns = [
-        (r'hi|hello|hey', ['Hello!', 'Hi there!', 'Welcome to the project management assistant.']),
-        (r'how are you?', ['I\'m functioning well, thank you!', 'I\'m operational and ready to assist with your project management.']),
-        (r'what is your name?', ['I\'m the Project Management Assistant.', 'You can call me the Assistant.']),
-        (r'what are the main activities of the student?', [f"The main activities are: {activities['Creative']} creative actions, {activities['Viewing']} viewing actions, and {activities['Administrative']} administrative actions."]),
-        (r'are they creative?', [f"Yes, the student has performed {activities['Creative']} creative actions."]),
-        (r'are they viewing?', [f"Yes, the student has performed {activities['Viewing']} viewing actions."]),
-        (r'are they administrative?', [f"Yes, the student has performed {activities['Administrative']} administrative actions."]),
-        (r'how many creative actions?', [f"The student has performed {activities['Creative']} creative actions."]),
-        (r'how many viewing actions?', [f"The student has performed {activities['Viewing']} viewing actions."]),
-        (r'how many administrative actions?', [f"The student has performed {activities['Administrative']} administrative actions."]),
-        (r'exit|bye|goodbye', ['Thank you for using the Project Management Assistant. Goodbye!', 'Farewell! Don\'t hesitate to return if you need more assistance with your project.']),
-        (r'what documents were accessed?', [f"The documents accessed were: {', '.join(documents.keys())}"]),
-        (r'what tabs were used?', [f"The tabs used were: {', '.join(tabs.keys())}"]),
-        (r'how many times was the document opened?', [f"The document was opened {descriptions['Open document']} times."]),
-        (r'how many times was the document closed?', [f"The document was closed {descriptions['Close document']} times."]),
-        (r'how many comments were made?', [f"{descriptions['Comment on a Document']} comments were made."]),
-        (r'how many users interacted with the document?', [f"{unique_users} unique users interacted with the document."]),
-    ]
-
-    # Create a chatbot
-    return Chat(patterns, reflections)
-
+            data = None
+
+    return data if isinstance(data, list) else None
+
+# One loader per server process, shared by all reruns and sessions
+@st.cache_resource
+def get_firebase_loader():
+    return CachedFirebaseLoader(firebase_url, FIREBASE_SNAPSHOT_PATH, ttl=FIREBASE_TTL_SECONDS, block_first=False)
+
+# Check the Firebase activity data (loaded in the background, None until the first download finishes).
+# The check is all the app uses this data for: the loader still downloads the
+# whole activity database, keeps it in memory and snapshots it on disk, only to
+# pick which error banner (if any) to show. The screens read the upload history
+# (history_store) instead.
+firebase_loader = get_firebase_loader()
+firebase_data = firebase_loader.get()
+if firebase_loader.has_value and firebase_activities(firebase_data) is None:
+    # Nothing downloaded (last_error says why) or data of another shape
+    if firebase_loader.last_error:
+        st.error("Could not reach Firebase to load the activity data, retrying in the background.")
+        st.caption(firebase_loader.last_error)
+    else:
+        st.error("Unexpected data structure from Firebase")
 
 # Initialize session state for chat history
 if 'chat_history' not in st.session_state:
@@ -149,82 +86,218 @@ def display_chat_history():
         st.write(message)
 
 # Helper functions to load and display JSON
+# The upload is parsed as a stream: each record is hashed and added to the
+# columnar table as it is read, so the list of records never exists in memory.
+# Returns the content hash, the number of records, the table and its validation report.
 def load_json(file):
+    from activity_schema import ValidationReport
+    from activity_table import build_activity_table_chunked
+    from json_stream import iter_json_records
+
+    hasher = history_store.ContentHasher()
+    report = ValidationReport()
+    progress_bar = st.progress(0.0, text=f"Reading '{file.name}'...")
+    def progress(bytes_read):
+        progress_bar.progress(min(bytes_read / max(file.size, 1), 1.0), text=f"Reading '{file.name}'...")
+
+    def hashed(records):
+        for record in records:
+            hasher.update(record)
+            yield record
+
     try:
-        json_data = json.load(file)
-        return json_data
+        file.seek(0)
+        with span('parse upload'):
+            table = build_activity_table_chunked(hashed(iter_json_records(file, progress)), report)
+        return hasher.hexdigest(), hasher.rows, table, report
     except Exception as e:
         st.error(f"Error loading JSON: {e}")
         return None
+    finally:
+        progress_bar.empty()
 
 def display_json(data):
     st.json(data)
 
-def filter_json_data(json_data, filters, start_date=None, end_date=None):
-    filtered_data = []
-    if not filters and not start_date and not end_date:
-        return json_data
-    for item in json_data:
-        match = True
-        for key, value in filters.items():
-            if key in item:
-                item_value = str(item[key])
-                if value.lower() not in item_value.lower():  # Substring match
-                    match = False
-                    break
-        if start_date and end_date:
-            item_date = item.get('Time')
-            if item_date:
-                item_date = datetime.strptime(item_date, '%Y-%m-%d %H:%M:%S')
-                if not (start_date <= item_date.date() <= end_date):
-                    match = False
-        if match:
-            filtered_data.append(item)
-    return filtered_data
+# Records left out of a dataset, and fields missing from its records
+def display_validation_report(report, filename=None):
+    prefix = f"'{filename}': " if filename else ""
+    if report.rows_rejected:
+        reasons = ", ".join(f"{count} with {reason}" for reason, count in report.rejected.most_common())
+        st.warning(f"{prefix}{report.rows_rejected} of {report.rows_read} records were skipped ({reasons}).")
+        with st.expander(f"{prefix}Skipped records"):
+            st.dataframe(report.sample_rows(), hide_index=True)
+    missing = [f"{column} ({count})" for column, count in report.missing.items() if count]
+    if missing and report.rows_read:
+        st.info(f"{prefix}Some records have no value for: {', '.join(missing)}.")
+
+# Parsed dataset tables of the server process, keyed by content hash and
+# shared read-only by all sessions, with the structures built on them that
+# keep a reference to the table: its filter index under (dataset_key,) and
+# the results grids of its filters under (dataset_key, filter_key). Bounded by
+# DATASET_CACHE_BYTES of memory, evicting the least recently used entries; a
+# table goes with its index and grids. A table larger than the whole budget
+# is still kept (alone), so the screens do not download it on every rerun.
+@st.cache_resource
+def get_dataset_cache():
+    return BudgetLRUCache(DATASET_CACHE_BYTES, sizeof=dataset_cache_sizeof, parent=dataset_cache_parent,
+                          keep_oversized=True)
+
+def dataset_cache_sizeof(value):
+    if hasattr(value, 'memory_bytes'):
+        return value.memory_bytes()
+    return int(value.memory_usage(deep=True).sum())
+
+def dataset_cache_parent(key):
+    if isinstance(key, str):
+        return None
+    return key[0] if len(key) == 1 else key[:1]
+
+# Columnar table of a dataset, built once per dataset and shared by all screens and sessions.
+# _load builds the table on a cache miss; sessions asking for it meanwhile wait for that one load.
+def get_activity_table(dataset_key, _load):
+    return get_dataset_cache().get_or_compute(dataset_key, _load)
+
+# Stream a stored upload from Firebase into a table, chunk by chunk
+def download_activity_table(dataset_key, report=None):
+    from activity_table import build_activity_table_chunked
+    with span('download dataset'):
+        return build_activity_table_chunked(history_store.iter_payload(firebase_history_url, dataset_key), report)
+
+# Tables of the given uploads. The ones not cached yet are downloaded and parsed
+# in parallel threads; reports receives each upload's validation report.
+def load_activity_tables(keys, reports=None):
+    from concurrent.futures import ThreadPoolExecutor
+    from activity_schema import ValidationReport
+
+    reports = {} if reports is None else reports
+    for key in keys:
+        reports.setdefault(key, ValidationReport())
+
+    def load(key):
+        return get_activity_table(key, lambda: download_activity_table(key, reports[key]))
+
+    if len(keys) == 1:
+        return [load(keys[0])]
+    with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_DOWNLOADS, len(keys))) as pool:
+        return list(pool.map(load, keys))
+
+# Table of a dataset made of one or more uploads ({key: filename}). Several
+# uploads are analyzed as their union, with a Source column naming the file
+# of each row; the union is cached like a single upload.
+def load_dataset(files, reports=None):
+    keys = list(files)
+    if len(keys) == 1:
+        return load_activity_tables(keys, reports)[0]
+
+    def union():
+        from activity_table import union_activity_tables
+        return union_activity_tables(load_activity_tables(keys, reports), list(files.values()))
+    return get_activity_table(history_store.dataset_key(keys), union)
+
+# Chatbot answers for a dataset, computed once and reused by every rerun and session
+@st.cache_resource(max_entries=8)
+def get_chatbot(dataset_key, _table):
+    from chat_engine import initialize_chatbot
+    with span('build chatbot'):
+        return initialize_chatbot(_table)
+
+# Lowercased filter columns of a dataset, prepared once and shared like the table
+def get_filter_index(dataset_key, table):
+    from filter_engine import FilterIndex
+
+    def build():
+        with span('filter index'):
+            return FilterIndex(table)
+    return get_dataset_cache().get_or_compute((dataset_key,), build)
+
+# Pre-aggregated counts behind the statistics charts, built once per dataset and filter combination
+@st.cache_resource(max_entries=32)
+def get_stats_cube(dataset_key, filter_key, _table, _rows):
+    import stats_cube
+    with span('stats cube'):
+        return stats_cube.build_stats_cube(_table, rows=_rows)
+
+# Sort orders of the filtered results, shared by every page view; searches use the dataset's filter index
+def get_results_grid(dataset_key, filter_key, table, rows):
+    from results_grid import ResultsGrid
+    index = get_filter_index(dataset_key, table)
+
+    def build():
+        with span('results grid'):
+            return ResultsGrid(table, rows, index)
+    return get_dataset_cache().get_or_compute((dataset_key, filter_key), build)
+
+# Rendered statistics charts shared by all sessions, keyed by dataset, filters and graph
+@st.cache_resource
+def get_chart_cache():
+    return BudgetLRUCache(CHART_CACHE_BYTES)
+
+# Generated export files shared by all sessions, keyed by dataset, filters and format
+@st.cache_resource
+def get_export_cache():
+    return BudgetLRUCache(EXPORT_CACHE_BYTES)
+
+def make_filter_key(filters, start_date, end_date):
+    return json.dumps([sorted(filters.items()), str(start_date), str(end_date)])
+
+# Table of the dataset selected on the Admin page. It is downloaded again when
+# it has been evicted from the dataset cache meanwhile; None (with an error
+# shown) when that download fails.
+def current_activity_table():
+    files = st.session_state['dataset_files']
+    try:
+        with st.spinner(f"Loading {', '.join(repr(name) for name in files.values())}..."):
+            return load_dataset(files)
+    except requests.RequestException:
+        st.error("Could not download the selected data from Firebase. Please try again later.")
+        return None
 
+# Row ids of the current dataset matching the filters. Sessions only keep these
+# ids; the rows themselves stay in the one shared table.
+def filter_activity_rows(table, filters, start_date=None, end_date=None):
+    from filter_engine import row_ids
+    index = get_filter_index(st.session_state['dataset_key'], table)
+    with span('filter rows'):
+        rows = row_ids(index.mask(filters, start_date, end_date))
+    # The index prepares the columns on their first use
+    get_dataset_cache().resize((st.session_state['dataset_key'],))
+    return rows
 
 def chatbot_screen():
-    if 'json_data' not in st.session_state or not st.session_state['json_data']:
+    if not st.session_state.get('dataset_key'):
         st.warning("Please select and load a JSON file on the Admin page before accessing the Chatbot.")
         return
     
     st.write("Hello! I'm the Project Management Assistant. How can I help you today?")
     
-    # Initialize the chatbot with the selected JSON data
-    chatbot = initialize_chatbot(st.session_state['json_data'])
+    # The chatbot of the selected JSON data, built once per dataset
+    table = current_activity_table()
+    if table is None:
+        return
+    chatbot = get_chatbot(st.session_state['dataset_key'], table)
 
     # Predefined questions
-    questions = [
-        "What are the main activities of the student?",
-        "Are they creative?",
-        "Are they viewing?",
-        "Are they administrative?",
-        "How many creative actions?",
-        "How many viewing actions?",
-        "How many administrative actions?",
-        "What documents were accessed?",
-        "What tabs were used?",
-        "How many times was the document opened?",
-        "How many times was the document closed?",
-        "How many comments were made?",
-        "How many users interacted with the document?"
-    ]
-
-    selected_question = st.selectbox("Select a question", questions)
+    from chat_engine import QUESTIONS
+    selected_question = st.selectbox("Select a question", QUESTIONS)
 
     # Button to ask a selected question
     if st.button("Ask"):
-        response = chatbot.respond(selected_question)
+        with span('answer question'):
+            response = chatbot.respond(selected_question)
         st.session_state.chat_history.append(f"You: {selected_question}")
         st.session_state.chat_history.append(f"ChatBot: {response}")
 
     # Text input for user to type a custom question
     user_input = st.text_input("Or type your question:", key="input")
+    st.caption("You can also ask for counts by student, document, tab and date, e.g. "
+               "\"How many creative actions did StudentB do in Assembly 3 last week?\"")
     if user_input:
         if user_input.lower() in ['exit', 'bye', 'goodbye']:
             st.write("ChatBot: Thank you for using the Project Management Assistant. Goodbye!")
         else:
-            response = chatbot.respond(user_input)
+            with span('answer question'):
+                response = chatbot.respond(user_input)
             st.session_state.chat_history.append(f"You: {user_input}")
             st.session_state.chat_history.append(f"ChatBot: {response}")
 
@@ -243,69 +316,100 @@ def chatbot_screen():
 def admin_screen():
     st.title("Admin Screen")
 
-    # Retrieve the upload history from Firebase
-    response = requests.get(firebase_history_url)
-    if response.status_code == 200 and response.json():
-        st.session_state['upload_history'] = response.json()
-    else:
-        st.session_state['upload_history'] = []
+    # Retrieve the upload history index (filenames only, no payloads) from Firebase
+    try:
+        st.session_state['upload_history'] = history_store.load_index(firebase_history_url)
+    except requests.RequestException:
+        st.session_state['upload_history'] = {}
 
     # Upload a new JSON file
     uploaded_file = st.file_uploader("Upload JSON File", type="json")
 
-    if uploaded_file is not None:
+    # The uploader keeps its file across reruns: an upload is read and saved
+    # once, and later reruns only show its validation report again
+    processed = st.session_state.get('processed_upload')
+    if uploaded_file is not None and processed is not None and processed[0] == uploaded_file.file_id:
+        if processed[1] is not None:
+            display_validation_report(processed[1])
+    elif uploaded_file is not None:
         # Load and store the JSON data
-        json_data = load_json(uploaded_file)
-        if json_data is not None:
-            # Check if the uploaded file already exists in the upload history
-            if not any(record['filename'] == uploaded_file.name for record in st.session_state['upload_history']):
-                # Create a new entry for the upload history
-                new_entry = {
-                    "filename": uploaded_file.name,
-                    "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    "data": json_data
-                }
-
-                # Add the new entry to the history
-                st.session_state['upload_history'].append(new_entry)
-
-                # Update the history in Firebase
-                response = requests.put(firebase_history_url, json.dumps(st.session_state['upload_history']))
-                if response.status_code == 200:
+        loaded = load_json(uploaded_file)
+        # A file that does not parse is not read again either
+        st.session_state['processed_upload'] = (uploaded_file.file_id, None)
+        if loaded is not None:
+            digest, rows, table, report = loaded
+            display_validation_report(report)
+            st.session_state['processed_upload'] = (uploaded_file.file_id, report)
+            # Keep the table built while reading, so selecting this file does not download it again
+            get_activity_table(digest, lambda: table)
+            # Check if the same content already exists in the upload history, under any name
+            existing = st.session_state['upload_history'].get(digest)
+            if existing is None:
+                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+                # Append the payload and its index entry to Firebase
+                try:
+                    with span('save upload'):
+                        key, entry = history_store.save_upload_file(firebase_history_url, uploaded_file.name,
+                                                                    timestamp, uploaded_file, digest, rows)
+                    st.session_state['upload_history'][key] = entry
                     st.success(f"File '{uploaded_file.name}' uploaded successfully!")
-                else:
+                except requests.RequestException:
+                    # Read it again on the next rerun, to retry the save
+                    st.session_state.pop('processed_upload', None)
                     st.error("Failed to update the upload history in Firebase.")
-            else:
+            elif existing['filename'] == uploaded_file.name:
                 st.warning("This file has already been uploaded.")
-
-    # Dropdown to select a JSON file from upload history
-    st.subheader("Select a JSON File")
-    if st.session_state['upload_history']:
-        file_options = [record['filename'] for record in st.session_state['upload_history']]
-        selected_file = st.selectbox("Choose a JSON file", file_options)
-
-        if selected_file:
-            # Only load the selected JSON data if it's not already loaded
-            if 'selected_file' not in st.session_state or st.session_state['selected_file'] != selected_file:
-                # Find the selected JSON data
-                for record in st.session_state['upload_history']:
-                    if record['filename'] == selected_file:
-                        selected_data = record['data']
-                        st.session_state['json_data'] = selected_data
-                        st.session_state['selected_file'] = selected_file
-                        st.success(f"JSON data from '{selected_file}' loaded successfully!")
-                        break
+            else:
+                st.warning(f"This file has already been uploaded as '{existing['filename']}'.")
+
+    # Select one or more JSON files from upload history; several are analyzed together
+    st.subheader("Select JSON Files")
+    upload_history = st.session_state['upload_history']
+    if upload_history:
+        file_keys = history_store.sorted_index_keys(upload_history)
+        loaded_keys = [key for key in st.session_state.get('dataset_files', {}) if key in upload_history]
+        selected_keys = st.multiselect("Choose JSON files", file_keys, default=loaded_keys or file_keys[:1],
+                                       format_func=lambda key: upload_history[key]['filename'])
+
+        if selected_keys:
+            files = {key: upload_history[key]['filename'] for key in file_keys if key in selected_keys}
+            selected_names = ", ".join(f"'{name}'" for name in files.values())
+            dataset_key = history_store.dataset_key(files)
+            # Only download the selected JSON data if it's not already loaded
+            if st.session_state.get('dataset_key') != dataset_key:
+                reports = {}
+                try:
+                    with st.spinner(f"Loading {selected_names}..."):
+                        with span('load dataset'):
+                            load_dataset(files, reports)
+                    st.session_state['dataset_files'] = files
+                    st.session_state['dataset_key'] = dataset_key
+                    # Row ids of the previous dataset mean nothing in this one
+                    st.session_state.pop('filtered_rows', None)
+                    st.success(f"JSON data from {selected_names} loaded successfully!")
+                    for key, report in reports.items():
+                        display_validation_report(report, files[key] if len(files) > 1 else None)
+                except requests.RequestException:
+                    st.error(f"Failed to download {selected_names} from Firebase.")
     else:
         st.write("No files available for selection.")
 
+    stats = get_dataset_cache().stats()
+    st.caption(f"Dataset cache: {stats['entries']} tables and indexes, {stats['bytes'] / 1e6:.0f} of "
+               f"{stats['max_bytes'] / 1e6:.0f} MB; {stats['hits']} hits, {stats['misses']} misses, "
+               f"{stats['evictions']} evictions")
+
         
 # Parameter Selection Screen to select parameters and apply filters
 def parameter_selection_screen():
     st.title("Parameter Selection Screen")
-    json_data = st.session_state.get('json_data')
-    if json_data:
+    if st.session_state.get('dataset_key'):
+        table = current_activity_table()
+        if table is None:
+            return
         st.write("Available parameters:")
-        params = list(json_data[0].keys()) if isinstance(json_data, list) else list(json_data.keys())
+        params = list(table.columns)
         selected_params = st.multiselect("Select parameters", params)
         filters = {}
         for param in selected_params:
@@ -320,14 +424,15 @@ def parameter_selection_screen():
         st.session_state['filters'] = filters
         st.session_state['start_date'] = start_date
         st.session_state['end_date'] = end_date
+        st.session_state['filter_key'] = make_filter_key(filters, start_date, end_date)
 
         st.write(f"Selected parameters: {selected_params}")
         st.write(f"Filter values: {filters}")
 
         if selected_params or (start_date and end_date):
-            filtered_data = filter_json_data(json_data, filters, start_date, end_date)
-            st.session_state['filtered_data'] = filtered_data
-            if filtered_data:
+            filtered_rows = filter_activity_rows(table, filters, start_date, end_date)
+            st.session_state['filtered_rows'] = filtered_rows
+            if len(filtered_rows):
                 st.success("Filters applied successfully! You can view the filtered data in the Parameters Results page.")
             else:
                 st.warning("No data matches the selected filters.")
@@ -339,150 +444,113 @@ def parameter_selection_screen():
 # Parameters Results Screen to display filtered data
 def parameters_results_screen():
     st.title("Parameters Results Screen")
-    filtered_data = st.session_state.get('filtered_data')
-    if filtered_data:
-        df = pd.DataFrame(filtered_data)
-
-        # Prepare the Excel file download button
-        towrite = io.BytesIO()
-        df.to_excel(towrite, index=False, header=True)
-        towrite.seek(0)
-        b64 = base64.b64encode(towrite.read()).decode()
-        linko = f'<a href="data:application/octet-stream;base64,{b64}" download="filtered_data.xlsx"><button>Download Excel file</button></a>'
-        
-        # Display the download button above the table
-        st.markdown(linko, unsafe_allow_html=True)
-        
-        # Display the table
-        st.table(df)
+    filtered_rows = st.session_state.get('filtered_rows')
+    if filtered_rows is not None and len(filtered_rows):
+        # The results are the filtered rows of the shared table, never copied out of it
+        table = current_activity_table()
+        if table is None:
+            return
+
+        # Display the download buttons above the table
+        export_buttons(table, filtered_rows)
+
+        # Display one page of the table, sorted and searched on the server
+        display_results_grid(table, filtered_rows)
     else:
         st.warning("No filtered data available. Please apply filters on the Parameter Selection screen.")
 
 
+# Download of the filtered results. A file is only generated when it is asked
+# for, then kept in the export cache so later downloads of the same dataset and
+# filters (from any session) are served from memory.
+def export_buttons(table, rows):
+    from exports import EXPORT_FORMATS, available_formats, export_table
+    format_col, button_col = st.columns([1, 2])
+    export_format = format_col.selectbox("Export format", available_formats())
+    extension, mime = EXPORT_FORMATS[export_format]
+    key = (st.session_state['dataset_key'], st.session_state['filter_key'], export_format)
+
+    export_cache = get_export_cache()
+    data = export_cache.get(key)
+    if data is None and button_col.button(f"Prepare {export_format} file"):
+        with st.spinner(f"Writing {len(rows)} rows..."):
+            with span(f"export {export_format}"):
+                data = export_cache.get_or_compute(key, lambda: export_table(table, export_format, rows))
+    if data is not None:
+        button_col.download_button(f"Download {export_format} file", data,
+                                   file_name=f"filtered_data.{extension}", mime=mime)
+
+# Paginated view of the filtered results. Only the visible page is sent to the browser.
+def display_results_grid(table, filtered_rows):
+    from results_grid import PAGE_SIZES, page_count
+    grid = get_results_grid(st.session_state['dataset_key'], st.session_state['filter_key'], table, filtered_rows)
+    columns = list(table.columns)
+
+    sort_col, order_col, size_col = st.columns([2, 1, 1])
+    sort_column = sort_col.selectbox("Sort by", [None] + columns,
+                                     format_func=lambda column: "(original order)" if column is None else column)
+    descending = order_col.selectbox("Order", ["Ascending", "Descending"]) == "Descending"
+    page_size = size_col.selectbox("Rows per page", PAGE_SIZES)
+
+    searches = {}
+    with st.expander("Search columns"):
+        for column in columns:
+            text = st.text_input(f"{column} contains", key=f"grid_search_{column}")
+            if text:
+                searches[column] = text
+
+    with span('grid query'):
+        rows = grid.rows(searches, sort_column, not descending)
+    # A new sort order makes the grid larger
+    get_dataset_cache().resize((st.session_state['dataset_key'], st.session_state['filter_key']))
+    n_pages = page_count(len(rows), page_size)
+    # Go back to a valid page when a search or the page size shrinks the results
+    if st.session_state.get('results_page', 1) > n_pages:
+        st.session_state['results_page'] = n_pages
+    page = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, step=1, key='results_page')
+
+    if len(rows):
+        start = (page - 1) * page_size
+        st.caption(f"Rows {start + 1}-{min(start + page_size, len(rows))} of {len(rows)}"
+                   + (f" (searched from {len(grid)})" if searches else ""))
+        st.dataframe(grid.page(rows, page - 1, page_size), hide_index=True)
+    else:
+        st.info("No rows match the column searches.")
+
+
 def interesting_statistics_screen():
+    import charts
     st.title("Interesting Statistics Page")
-    filtered_data = st.session_state.get('filtered_data')
+    filtered_rows = st.session_state.get('filtered_rows')
     
-    if filtered_data:
+    if filtered_rows is not None and len(filtered_rows):
         st.write("**Filters Applied:**")
         filters = st.session_state.get('filters', {})
         for key, value in filters.items():
             st.write(f"{key}: {value}")
         st.write("---")
 
-        df = pd.DataFrame(filtered_data)
-        df['Time'] = pd.to_datetime(df['Time'], errors='coerce')
-        df = df.dropna(subset=['Time'])
-
         # Dropdown menu to select graphs
         graphs_to_display = st.multiselect(
             "Select graphs to display",
-            ["Activity Distribution by Category",
-             "Users with the Most Actions",
-             "Number of Actions Per Day",
-             "Activity Type Distribution Over Time",
-             "Top Tabs Used",
-             "Heatmap of Actions by Hour of Day and Day of Week",  # Keep only this heatmap
-             "Activities Distribution Among Students"],  # New graph option
-            default=["Activity Distribution by Category", "Activities Distribution Among Students"]  # Default selections
+            charts.GRAPHS,
+            default=charts.DEFAULT_GRAPHS  # Default selections
         )
 
-        # Add logic to display each graph
-        if "Activity Distribution by Category" in graphs_to_display:
-            st.write("**1. Activity Distribution by Category:**")
-            activity_categories = df['Description'].apply(categorize_activity)
-            category_counts = activity_categories.value_counts()
-
-            fig, ax = plt.subplots()
-            category_counts.plot(kind='bar', ax=ax)
-            ax.set_title("Activity Distribution by Category")
-            ax.set_xlabel("Category")
-            ax.set_ylabel("Number of Activities")
-            st.pyplot(fig)
-
-        if "Users with the Most Actions" in graphs_to_display:
-            st.write("**2. Users with the Most Actions:**")
-            top_users_actions = df['User'].value_counts().head(10)
-
-            fig, ax = plt.subplots()
-            top_users_actions.plot(kind='barh', ax=ax)
-            ax.set_title("Top Users by Number of Actions")
-            ax.set_xlabel("Number of Actions")
-            ax.set_ylabel("User")
-            st.pyplot(fig)
-
-        if "Number of Actions Per Day" in graphs_to_display:
-            st.write("**3. Number of Actions Per Day:**")
-            actions_per_day = df.groupby(df['Time'].dt.date)['Description'].count()
-
-            fig, ax = plt.subplots()
-            actions_per_day.plot(kind='line', ax=ax)
-            ax.set_title("Number of Actions Per Day")
-            ax.set_xlabel("Date")
-            ax.set_ylabel("Number of Actions")
-
-            plt.xticks(rotation=45, ha='right')
-            plt.tight_layout()
-
-            st.pyplot(fig)
-
-        if "Activity Type Distribution Over Time" in graphs_to_display:
-            st.write("**4. Activity Type Distribution Over Time:**")
-            df['ActivityType'] = df['Description'].apply(categorize_activity)
-            activity_type_over_time = df.groupby([df['Time'].dt.date, 'ActivityType']).size().unstack(fill_value=0)
-
-            fig, ax = plt.subplots()
-            activity_type_over_time.plot(kind='area', stacked=True, ax=ax)
-            ax.set_title("Activity Type Distribution Over Time")
-            ax.set_xlabel("Date")
-            ax.set_ylabel("Number of Actions")
-
-            plt.xticks(rotation=45, ha='right')
-            plt.tight_layout()
-
-            st.pyplot(fig)
-
-        if "Top Tabs Used" in graphs_to_display:
-            st.write("**5. Top Tabs Used:**")
-            top_tabs = df['Tab'].value_counts().head(10)
-
-            fig, ax = plt.subplots()
-            top_tabs.plot(kind='bar', ax=ax)
-            ax.set_title("Top Tabs Used")
-            ax.set_xlabel("Tab")
-            ax.set_ylabel("Number of Times Accessed")
-            st.pyplot(fig)
-
-        if "Heatmap of Actions by Hour of Day and Day of Week" in graphs_to_display:
-            st.write("**6. Heatmap of Actions by Hour of Day and Day of Week:**")
-            df['DayOfWeek'] = df['Time'].dt.day_name()
-            df['Hour'] = df['Time'].dt.hour
-            actions_heatmap_data = df.pivot_table(index='DayOfWeek', columns='Hour', values='Description', aggfunc='count').fillna(0)
-
-            plt.figure(figsize=(10, 8))
-            sns.heatmap(actions_heatmap_data, cmap='coolwarm', annot=True, fmt='.0f')
-            plt.title('Heatmap of Actions by Hour of Day and Day of Week')
-            plt.xlabel('Hour of Day')
-            plt.ylabel('Day of Week')
-
-            buffer = BytesIO()
-            plt.savefig(buffer, format='png')
-            buffer.seek(0)
-            st.image(buffer, caption='Heatmap of Actions by Hour of Day and Day of Week')
-            plt.close()
-
-        if "Activities Distribution Among Students" in graphs_to_display:
-            st.write("**7. Activities Distribution Among Students:**")
-            
-            # Group by user and activity type
-            student_activity = df.groupby(['User', df['Description'].apply(categorize_activity)]).size().unstack(fill_value=0)
-            
-            fig, ax = plt.subplots()
-            student_activity.plot(kind='bar', stacked=True, ax=ax, colormap='viridis')
-            ax.set_title("Activities Distribution Among Students")
-            ax.set_xlabel("Student")
-            ax.set_ylabel("Number of Activities")
-            st.pyplot(fig)
+        # Serve each graph as cached PNG bytes, rendering it only on a cache miss
+        table = current_activity_table()
+        if table is None:
+            return
+        cube = get_stats_cube(st.session_state['dataset_key'], st.session_state['filter_key'], table, filtered_rows)
+        chart_cache = get_chart_cache()
+        for number, graph in enumerate(charts.GRAPHS, start=1):
+            if graph in graphs_to_display:
+                st.write(f"**{number}. {graph}:**")
+                key = (st.session_state['dataset_key'], st.session_state['filter_key'], graph)
+                with span(f"chart: {graph}"):
+                    png = chart_cache.get_or_compute(key, lambda: charts.render_chart_png(graph, cube))
+                caption = graph if graph == "Heatmap of Actions by Hour of Day and Day of Week" else None
+                st.image(png, caption=caption)
 
     else:
         st.warning("No filtered data available. Please apply filters on the Parameter Selection screen.")
@@ -491,21 +559,48 @@ def interesting_statistics_screen():
 
 
 
+# Debug panel with the stages of this rerun, the totals of the server process
+# and their exports (JSON lines, Prometheus text format). Peak memory is only
+# measured when the server runs with APP_TRACE_MEMORY set.
+def timing_panel(timings):
+    with st.sidebar.expander("Timings", expanded=True):
+        peak = timings.peak_memory_bytes
+        st.caption(f"This rerun: {timings.seconds * 1000:.0f} ms"
+                   + (f", peak memory {peak / 1e6:.1f} MB" if peak is not None else ""))
+        st.dataframe([{'Stage': '· ' * span.depth + span.name, 'ms': round(span.seconds * 1000, 1)}
+                      for span in timings.spans], hide_index=True)
+
+        st.caption("Server totals")
+        st.dataframe([{'Screen': row['screen'], 'Stage': row['span'], 'Count': row['count'],
+                       'Mean ms': round(row['total_seconds'] / row['count'] * 1000, 1),
+                       'Max ms': round(row['max_seconds'] * 1000, 1)}
+                      for row in instrumentation.timing_log.summary()], hide_index=True)
+        st.download_button("Download JSON lines", instrumentation.timing_log.to_jsonl(),
+                           file_name="timings.jsonl", mime="application/x-ndjson")
+        st.download_button("Download Prometheus metrics", instrumentation.timing_log.to_prometheus(),
+                           file_name="metrics.prom", mime="text/plain")
+
 # Main functio n to define screen routing
 def main():
     st.sidebar.title("Navigation")
     screen = st.sidebar.radio("Go to", ["Admin", "Chatbot", "Parameter Selection", "Parameters Results", "Interesting Statistics"], index=0)
 
-    if screen == "Admin":
-        admin_screen()
-    elif screen == "Chatbot":
-        chatbot_screen()
-    elif screen == "Parameter Selection":
-        parameter_selection_screen()
-    elif screen == "Parameters Results":
-        parameters_results_screen()
-    elif screen == "Interesting Statistics":
-        interesting_statistics_screen()
+    # Each rerun is timed, with the stages of the screen as spans inside it
+    with instrumentation.rerun(screen) as timings:
+        with span(screen):
+            if screen == "Admin":
+                admin_screen()
+            elif screen == "Chatbot":
+                chatbot_screen()
+            elif screen == "Parameter Selection":
+                parameter_selection_screen()
+            elif screen == "Parameters Results":
+                parameters_results_screen()
+            elif screen == "Interesting Statistics":
+                interesting_statistics_screen()
+
+    if DEBUG_PANEL:
+        timing_panel(timings)
 
 if __name__ == "__main__":
     main()
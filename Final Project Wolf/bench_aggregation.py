@@ -0,0 +1,48 @@
+import os
+
+import aggregation
+from activity_table import build_activity_table
+from bench_filter import make_records
+from bench_suite import bench_parser, timed
+from chat_queries import CountIndex
+from stats_cube import CUBE_DIMENSIONS, build_stats_cube
+
+
+# Time of the large aggregations (statistics cube, chatbot count index) run
+# in-process and in the aggregation process pool with several worker counts,
+# checking that every run gives the same result:
+#
+#   python bench_aggregation.py --rows 2000000 --workers 1 2 4
+def sorted_cube(cube):
+    return cube.sort_values(CUBE_DIMENSIONS).reset_index(drop=True)
+
+
+def main():
+    parser = bench_parser("Benchmark the process-pool aggregations")
+    parser.add_argument('--rows', type=int, default=2000000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    table = build_activity_table(make_records(args.rows))
+    # Use the pool whatever the size, to see where it starts paying off
+    aggregation.PARALLEL_MIN_ROWS = 0
+    print(f"{args.rows} rows, {os.cpu_count()} cores")
+    reference = None
+    for workers in args.workers:
+        # The first call starts the pool; time the warm ones
+        build_stats_cube(table.iloc[:1000], workers=workers)
+        cube_time, cube = timed(lambda: build_stats_cube(table, workers=workers), args.repeat)
+        index_time, index = timed(lambda: CountIndex(table, workers=workers), args.repeat)
+        print(f"workers {workers:2d}   cube {cube_time * 1000:8.0f} ms   count index {index_time * 1000:8.0f} ms")
+
+        if reference is None:
+            reference = sorted_cube(cube), index
+        else:
+            assert sorted_cube(cube).equals(reference[0])
+            assert index.count() == reference[1].count()
+            for subset, entries in reference[1].indexes.items():
+                assert entries.keys() == index.indexes[subset].keys()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import json
+import os
+from datetime import date, datetime, timedelta
+
+from activity_table import TIME_FORMAT, build_activity_table
+from bench_suite import bench_parser, timed
+from filter_engine import FilterIndex, filter_json_data
+
+
+# Times filter_json_data against FilterIndex on the committed sample log,
+# repeated (with shifted timestamps) up to the requested number of rows, and
+# checks that both select exactly the same rows:
+#
+#   python bench_filter.py --rows 100000
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test json.json')
+
+CASES = [
+    ("date range only", {}, date(2022, 11, 1), date(2022, 12, 31)),
+    ("user", {'User': 'studenta'}, date(2000, 1, 1), date(2100, 1, 1)),
+    ("user + tab + date", {'User': 'student', 'Tab': 'assembly'}, date(2022, 11, 1), date(2023, 3, 1)),
+    ("description", {'Description': 'close'}, date(2000, 1, 1), date(2100, 1, 1)),
+    ("time text", {'Time': '2022-11-17'}, date(2000, 1, 1), date(2100, 1, 1)),
+]
+
+
+def make_records(rows):
+    with open(SAMPLE_PATH, 'r', encoding='utf-8') as f:
+        sample = json.load(f)
+    records = []
+    copy = 0
+    while len(records) < rows:
+        shift = timedelta(days=7 * copy)
+        for item in sample[:rows - len(records)]:
+            item = dict(item)
+            item['Time'] = (datetime.strptime(item['Time'], TIME_FORMAT) + shift).strftime(TIME_FORMAT)
+            records.append(item)
+        copy += 1
+    return records
+
+
+def main():
+    parser = bench_parser("Benchmark the activity filters")
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    records = make_records(args.rows)
+    build_time, table = timed(lambda: build_activity_table(records), 1)
+    index_time, index = timed(lambda: FilterIndex(table), 1)
+    print(f"{args.rows} rows: table built in {build_time:.3f}s, filter index in {index_time:.3f}s")
+
+    positions = {id(item): i for i, item in enumerate(records)}
+    for name, filters, start_date, end_date in CASES:
+        loop_time, expected = timed(lambda: filter_json_data(records, filters, start_date, end_date), args.repeat)
+        mask_time, mask = timed(lambda: index.mask(filters, start_date, end_date), args.repeat)
+        expected_rows = [positions[id(item)] for item in expected]
+        assert mask.nonzero()[0].tolist() == expected_rows, f"{name}: results differ"
+        print(f"{name:20s} {len(expected_rows):8d} rows  loop {loop_time * 1000:9.1f} ms"
+              f"  vectorized {mask_time * 1000:7.2f} ms  x{loop_time / mask_time:6.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import io
+import json
+import tracemalloc
+
+from activity_table import build_activity_table, build_activity_table_chunked
+from bench_filter import make_records
+from bench_suite import bench_parser, timed
+from history_store import ContentHasher, content_hash
+from json_stream import iter_json_records
+
+
+# Time and peak Python memory of turning an uploaded JSON file into the
+# activity table plus its content hash: json.load of the whole list (the old
+# upload path) against the streaming parser feeding the chunked table builder.
+#
+#   python bench_ingest.py --rows 200000 --repeat 3
+def load_whole(raw):
+    records = json.load(io.BytesIO(raw))
+    return content_hash(records), build_activity_table(records)
+
+
+def load_streaming(raw):
+    hasher = ContentHasher()
+
+    def hashed(records):
+        for record in records:
+            hasher.update(record)
+            yield record
+
+    table = build_activity_table_chunked(hashed(iter_json_records(io.BytesIO(raw))))
+    return hasher.hexdigest(), table
+
+
+# Best time of repeat loads, then the peak memory of one more (tracemalloc
+# slows the load down, so it is not timed)
+def measure(load, raw, repeat):
+    elapsed, _ = timed(lambda: load(raw), repeat)
+    tracemalloc.start()
+    digest, table = load(raw)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, digest, table
+
+
+def main():
+    parser = bench_parser("Benchmark loading an uploaded JSON file", repeat=1)
+    parser.add_argument('--rows', type=int, default=200000)
+    args = parser.parse_args()
+
+    raw = json.dumps(make_records(args.rows)).encode('utf-8')
+    print(f"{args.rows} records, {len(raw) / 1e6:.1f} MB of JSON")
+    results = {}
+    for name, load in [('json.load', load_whole), ('streaming', load_streaming)]:
+        elapsed, peak, digest, table = measure(load, raw, args.repeat)
+        results[name] = (digest, table)
+        print(f"{name:10s} {elapsed:6.2f} s   peak {peak / 1e6:7.1f} MB")
+
+    (digest, table), (stream_digest, stream_table) = results.values()
+    assert digest == stream_digest
+    assert table.equals(stream_table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import random
+
+from bench_suite import bench_parser, timed
+from intent_matcher import IntentMatcher
+
+
+# Per-query latency of IntentMatcher as the number of intents grows, next to
+# nltk's Chat (a sequential regex scan) when nltk is installed:
+#
+#   python bench_intents.py --intents 10 100 500 1000
+WORDS = ['creative', 'viewing', 'administrative', 'assembly', 'part', 'studio', 'drawing', 'document',
+         'comment', 'rename', 'export', 'import', 'sketch', 'feature', 'mate', 'tab', 'user', 'version']
+
+
+def make_phrases(count, seed=0):
+    rng = random.Random(seed)
+    phrases = set()
+    while len(phrases) < count:
+        phrases.add(f"how many {' '.join(rng.sample(WORDS, 3))} actions {len(phrases)}")
+    return sorted(phrases)
+
+
+def per_query_us(respond, queries, repeat):
+    def run():
+        for query in queries:
+            respond(query)
+    best, _ = timed(run, repeat)
+    return best / len(queries) * 1e6
+
+
+def main():
+    parser = bench_parser("Benchmark the chatbot intent matcher")
+    parser.add_argument('--intents', type=int, nargs='+', default=[10, 100, 500, 1000])
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    try:
+        from nltk.chat.util import Chat, reflections
+    except ImportError:
+        Chat = None
+
+    print(f"{'intents':>8} {'trie hit':>10} {'trie miss':>10} {'Chat hit':>10} {'Chat miss':>10}   (us/query)")
+    for count in args.intents:
+        phrases = make_phrases(count)
+        matcher = IntentMatcher()
+        for i, phrase in enumerate(phrases):
+            matcher.add(f"intent_{i}", [phrase], [f"answer {i}"])
+
+        rng = random.Random(1)
+        hits = [rng.choice(phrases) + '?' for _ in range(args.queries)]
+        misses = [f"how many {' '.join(rng.sample(WORDS, 3))} things" for _ in range(args.queries)]
+        for query in hits[:50]:
+            assert matcher.respond(query) is not None
+
+        row = [per_query_us(matcher.respond, hits, args.repeat), per_query_us(matcher.respond, misses, args.repeat)]
+        if Chat is not None:
+            chat = Chat([(phrase + r'\??', [f"answer {i}"]) for i, phrase in enumerate(phrases)], reflections)
+            row += [per_query_us(chat.respond, hits, args.repeat), per_query_us(chat.respond, misses, args.repeat)]
+        print(f"{count:>8} " + ' '.join(f"{value:>10.1f}" for value in row))
+
+
+if __name__ == "__main__":
+    main()
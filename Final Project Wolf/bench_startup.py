@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+
+from bench_suite import bench_parser
+
+
+# Startup cost of the app script, each measurement in a fresh interpreter:
+#
+# - "import app": everything the first run of the script pays before the
+#   Admin page is drawn (Streamlit runs it as __main__; importing it runs the
+#   same top-level code without main()), and which heavy libraries it loaded.
+# - rerun: re-executing the script's top level with the modules already loaded,
+#   which Streamlit does on every widget interaction.
+# - what the removed eager imports and nltk.download calls cost on their own.
+#
+# Each one is timed inside the fresh interpreter (so its own startup is not
+# counted) and the best of --repeat runs is reported.
+#
+#   python bench_startup.py
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ['pandas', 'numpy', 'matplotlib', 'seaborn', 'nltk']
+
+APP_IMPORT = f'''
+import sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+loaded = [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+print(f"{{elapsed:.3f}}", ",".join(loaded) or "-")
+'''
+
+APP_RERUN = '''
+import runpy, time
+import app
+runs = []
+for _ in range(20):
+    start = time.perf_counter()
+    runpy.run_path("app.py", run_name="rerun")
+    runs.append(time.perf_counter() - start)
+print(f"{sorted(runs)[len(runs) // 2]:.4f}")
+'''
+
+LIBRARY_IMPORT = '''
+import time
+start = time.perf_counter()
+{statement}
+print(f"{{time.perf_counter() - start:.3f}}")
+'''
+
+
+def run(code):
+    environment = dict(os.environ, PYTHONWARNINGS='ignore')
+    result = subprocess.run([sys.executable, '-c', code], cwd=APP_DIR, capture_output=True, text=True,
+                            env=environment, timeout=300)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return result.stdout.strip().splitlines()[-1]
+
+
+def main():
+    parser = bench_parser("Measure the app's startup and rerun overhead")
+    args = parser.parse_args()
+
+    imports = [run(APP_IMPORT).split() for _ in range(args.repeat)]
+    best = min(imports, key=lambda row: float(row[0]))
+    print(f"first run (import app):   {float(best[0]) * 1000:8.0f} ms   heavy modules loaded: {best[1]}")
+    print(f"rerun (script top level): {float(run(APP_RERUN)) * 1000:8.1f} ms")
+
+    print("no longer paid by the top level:")
+    for name, statement in [
+        ("pandas", "import pandas"),
+        ("matplotlib.pyplot", "import matplotlib.pyplot"),
+        ("seaborn (with matplotlib)", "import seaborn"),
+        ("nltk", "import nltk"),
+        ("nltk.download x2 (per rerun)", "import nltk; t = time.perf_counter(); "
+                                         "nltk.download('punkt', quiet=True); nltk.download('wordnet', quiet=True); "
+                                         "start = t"),
+    ]:
+        try:
+            timings = [float(run(LIBRARY_IMPORT.format(statement=statement))) for _ in range(args.repeat)]
+            print(f"  {name:30s} {min(timings) * 1000:8.0f} ms")
+        except RuntimeError as e:
+            print(f"  {name:30s} unavailable ({e})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date
+
+from activity_generator import Vocabulary, generate_records
+
+
+# End-to-end timings of the app's hot paths on generated logs of several
+# sizes, compared with the baselines stored in bench_baselines.json:
+#
+#   python bench_suite.py                        # compare with the baselines
+#   python bench_suite.py --sizes 1000 1000000   # other sizes
+#   python bench_suite.py --save                 # record new baselines
+#
+# A case is reported as a regression when it takes more than --tolerance times
+# its baseline (and at least MIN_REGRESSION_SECONDS more, so that the noise of
+# millisecond cases is ignored); the script then exits with status 1. The
+# baselines were measured on one machine: record new ones (--save) before
+# comparing on another. Sizes of millions of rows need several GB of memory
+# for the list of records filter_json_data works on.
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINES_PATH = os.path.join(APP_DIR, 'bench_baselines.json')
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+MIN_REGRESSION_SECONDS = 0.005
+
+FILTERS = {'User': 'studenta', 'Tab': 'assembly'}
+START_DATE = date(2022, 11, 1)
+END_DATE = date(2023, 1, 31)
+
+
+# Best time of repeat calls of function, and its result. Shared by the bench_* scripts.
+def timed(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+# Command line of a bench script, with the --repeat option every one of them takes
+def bench_parser(description, repeat=3):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--repeat', type=int, default=repeat)
+    return parser
+
+
+# (name, function) of every case for one log. Each function works on the
+# results of the earlier cases (the table, the cube) that the app would have
+# cached by then, and starts from cold caches of its own.
+def make_cases(records):
+    import charts
+    from activity_categories import categorize_activity, categorize_column
+    from activity_table import build_activity_table
+    from chat_engine import initialize_chatbot
+    from exports import export_table
+    from filter_engine import FilterIndex, filter_json_data
+    from stats_cube import build_stats_cube
+
+    state = {}
+
+    def build_table():
+        state['table'] = build_activity_table(records)
+        return state['table']
+
+    def categorize():
+        categorize_activity.cache_clear()
+        return categorize_column(state['table']['Description'])
+
+    def build_cube():
+        state['cube'] = build_stats_cube(state['table'])
+        return state['cube']
+
+    cases = [
+        ('build_activity_table', build_table),
+        ('filter_json_data', lambda: filter_json_data(records, FILTERS, START_DATE, END_DATE)),
+        ('FilterIndex.mask', lambda: FilterIndex(state['table']).mask(FILTERS, START_DATE, END_DATE)),
+        ('categorize_activity', categorize),
+        ('initialize_chatbot', lambda: initialize_chatbot(state['table'])),
+        ('build_stats_cube', build_cube),
+    ]
+    for graph in charts.GRAPHS:
+        cases.append((f"chart: {graph}", lambda graph=graph: charts.render_chart_png(graph, state['cube'])))
+    cases.append(('export Excel', lambda: export_table(state['table'], 'Excel')))
+    return cases
+
+
+def load_baselines():
+    if not os.path.exists(BASELINES_PATH):
+        return {}
+    with open(BASELINES_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = bench_parser("Benchmark the app's hot paths against stored baselines")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--tolerance', type=float, default=1.5)
+    parser.add_argument('--cases', nargs='+', help="only the cases whose name contains one of these")
+    parser.add_argument('--save', action='store_true', help="store these timings as the new baselines")
+    args = parser.parse_args()
+
+    baselines = load_baselines()
+    vocabulary = Vocabulary()
+    regressions = []
+    for rows in args.sizes:
+        records = generate_records(rows, vocabulary=vocabulary)
+        baseline = baselines.get(str(rows), {})
+        timings = {}
+        print(f"\n{rows} rows")
+        for name, function in make_cases(records):
+            selected = not args.cases or any(part in name for part in args.cases)
+            # Cases the later ones depend on run anyway, untimed when not selected
+            if not selected:
+                if name in ('build_activity_table', 'build_stats_cube'):
+                    function()
+                continue
+            elapsed, _ = timed(function, args.repeat)
+            timings[name] = elapsed
+            line = f"  {name:60s} {elapsed * 1000:10.1f} ms"
+            if name in baseline:
+                ratio = elapsed / baseline[name]
+                line += f"   baseline {baseline[name] * 1000:10.1f} ms  x{ratio:5.2f}"
+                if ratio > args.tolerance and elapsed - baseline[name] > MIN_REGRESSION_SECONDS:
+                    line += "  REGRESSION"
+                    regressions.append((rows, name))
+            print(line)
+        if args.save:
+            baselines.setdefault(str(rows), {}).update({name: round(elapsed, 6) for name, elapsed in timings.items()})
+
+    if args.save:
+        with open(BASELINES_PATH, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nBaselines saved to {BASELINES_PATH}")
+    elif regressions:
+        print(f"\n{len(regressions)} regressions: " + ", ".join(f"{name} ({rows} rows)" for rows, name in regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import threading
+from collections import OrderedDict
+
+
+# Thread-safe LRU cache bounded by the total size of its values rather than by
+# their number. sizeof(value) gives a value's size in bytes; when the total
+# goes over max_bytes the least recently used entries are evicted. Threads
+# asking for the same missing key compute it once: the others wait for that
+# value.
+#
+# - parent(key), when given, names the entry a value was built from (None for
+#   none). An entry that is evicted or replaced takes the entries built from
+#   it along, so they never keep an evicted value alive.
+# - A value larger than the whole budget is not stored at all, unless
+#   keep_oversized is set: it is then kept with the entries it was built
+#   from, and everything else is evicted.
+# - resize(key) measures a value again after it has grown in place.
+class BudgetLRUCache:
+    def __init__(self, max_bytes, sizeof=len, parent=None, keep_oversized=False):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.parent = parent or (lambda key: None)
+        self.keep_oversized = keep_oversized
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self.computing = {}
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            if size > self.max_bytes and not self.keep_oversized:
+                return value
+            self.entries[key] = (value, size)
+            self.total_bytes += size
+            self._evict(key)
+        return value
+
+    def resize(self, key):
+        with self.lock:
+            if key not in self.entries:
+                return
+            value = self.entries[key][0]
+        size = self.sizeof(value)
+        with self.lock:
+            if key in self.entries and self.entries[key][0] is value:
+                self.total_bytes += size - self.entries[key][1]
+                self.entries[key] = (value, size)
+                self._evict(key)
+
+    # Evict least recently used entries until the total fits, sparing key and
+    # the entries it was built from
+    def _evict(self, key):
+        kept = set()
+        while key is not None:
+            kept.add(key)
+            key = self.parent(key)
+        while self.total_bytes > self.max_bytes:
+            evicted = next((other for other in self.entries if other not in kept), None)
+            if evicted is None:
+                break
+            self._remove(evicted)
+            self.evictions += 1
+
+    # Drop an entry and the entries built from it
+    def _remove(self, key):
+        self.total_bytes -= self.entries.pop(key)[1]
+        for other in [other for other in self.entries if self.parent(other) == key]:
+            if other in self.entries:
+                self._remove(other)
+
+    # Cached value for key, computing and storing it with compute() on a miss
+    def get_or_compute(self, key, compute):
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+        with self.lock:
+            key_lock = self.computing.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                # Computed by another thread while this one waited
+                with self.lock:
+                    if key in self.entries:
+                        return self.entries[key][0]
+                return self.put(key, compute())
+        finally:
+            with self.lock:
+                if self.computing.get(key) is key_lock:
+                    del self.computing[key]
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
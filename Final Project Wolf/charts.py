@@ -0,0 +1,131 @@
+import threading
+from io import BytesIO
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+import stats_cube
+
+
+# Graphs of the Interesting Statistics page, in display order
+GRAPHS = [
+    "Activity Distribution by Category",
+    "Users with the Most Actions",
+    "Number of Actions Per Day",
+    "Activity Type Distribution Over Time",
+    "Top Tabs Used",
+    "Heatmap of Actions by Hour of Day and Day of Week",
+    "Activities Distribution Among Students",
+]
+DEFAULT_GRAPHS = ["Activity Distribution by Category", "Activities Distribution Among Students"]
+
+# pyplot keeps global state, so sessions render one figure at a time
+_render_lock = threading.Lock()
+
+
+def activity_distribution_by_category(cube):
+    category_counts = stats_cube.activity_category_counts(cube)
+
+    fig, ax = plt.subplots()
+    category_counts.plot(kind='bar', ax=ax)
+    ax.set_title("Activity Distribution by Category")
+    ax.set_xlabel("Category")
+    ax.set_ylabel("Number of Activities")
+    return fig
+
+
+def users_with_most_actions(cube):
+    top_users_actions = stats_cube.top_counts(cube, 'User')
+
+    fig, ax = plt.subplots()
+    top_users_actions.plot(kind='barh', ax=ax)
+    ax.set_title("Top Users by Number of Actions")
+    ax.set_xlabel("Number of Actions")
+    ax.set_ylabel("User")
+    return fig
+
+
+def actions_per_day(cube):
+    actions_per_day = stats_cube.actions_per_day(cube)
+
+    fig, ax = plt.subplots()
+    actions_per_day.plot(kind='line', ax=ax)
+    ax.set_title("Number of Actions Per Day")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Number of Actions")
+
+    plt.xticks(rotation=45, ha='right')
+    plt.tight_layout()
+    return fig
+
+
+def activity_type_over_time(cube):
+    activity_type_over_time = stats_cube.activity_types_per_day(cube)
+
+    fig, ax = plt.subplots()
+    activity_type_over_time.plot(kind='area', stacked=True, ax=ax)
+    ax.set_title("Activity Type Distribution Over Time")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Number of Actions")
+
+    plt.xticks(rotation=45, ha='right')
+    plt.tight_layout()
+    return fig
+
+
+def top_tabs_used(cube):
+    top_tabs = stats_cube.top_counts(cube, 'Tab')
+
+    fig, ax = plt.subplots()
+    top_tabs.plot(kind='bar', ax=ax)
+    ax.set_title("Top Tabs Used")
+    ax.set_xlabel("Tab")
+    ax.set_ylabel("Number of Times Accessed")
+    return fig
+
+
+def actions_heatmap(cube):
+    actions_heatmap_data = stats_cube.weekday_hour_counts(cube)
+
+    fig = plt.figure(figsize=(10, 8))
+    sns.heatmap(actions_heatmap_data, cmap='coolwarm', annot=True, fmt='.0f')
+    plt.title('Heatmap of Actions by Hour of Day and Day of Week')
+    plt.xlabel('Hour of Day')
+    plt.ylabel('Day of Week')
+    return fig
+
+
+def activities_among_students(cube):
+    student_activity = stats_cube.activities_per_user(cube)
+
+    fig, ax = plt.subplots()
+    student_activity.plot(kind='bar', stacked=True, ax=ax, colormap='viridis')
+    ax.set_title("Activities Distribution Among Students")
+    ax.set_xlabel("Student")
+    ax.set_ylabel("Number of Activities")
+    return fig
+
+
+CHART_FUNCTIONS = dict(zip(GRAPHS, [
+    activity_distribution_by_category,
+    users_with_most_actions,
+    actions_per_day,
+    activity_type_over_time,
+    top_tabs_used,
+    actions_heatmap,
+    activities_among_students,
+]))
+
+
+# Draw a graph from the statistics cube and rasterize it to PNG bytes
+def render_chart_png(graph, cube):
+    buffer = BytesIO()
+    with _render_lock:
+        fig = CHART_FUNCTIONS[graph](cube)
+        try:
+            fig.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
+        finally:
+            plt.close(fig)
+    return buffer.getvalue()
@@ -0,0 +1,93 @@
+import re
+
+from activity_table import column_counts
+from chat_queries import CountQueries
+from intent_matcher import IntentMatcher
+
+
+# Predefined questions offered in the Chatbot screen
+QUESTIONS = [
+    "What are the main activities of the student?",
+    "Are they creative?",
+    "Are they viewing?",
+    "Are they administrative?",
+    "How many creative actions?",
+    "How many viewing actions?",
+    "How many administrative actions?",
+    "What documents were accessed?",
+    "What tabs were used?",
+    "How many times was the document opened?",
+    "How many times was the document closed?",
+    "How many comments were made?",
+    "How many users interacted with the document?"
+]
+
+
+# Process the data to extract relevant information for the chatbot
+def summarize_activity_table(table):
+    return {
+        'users': column_counts(table, 'User'),
+        'documents': column_counts(table, 'Document'),
+        'tabs': column_counts(table, 'Tab'),
+        'descriptions': column_counts(table, 'Description'),
+        'activities': column_counts(table, 'ActivityType'),
+        'total_actions': len(table),
+    }
+
+
+# Define intents and responses, in priority order
+def build_intents(summary):
+    activities = summary['activities']
+    documents = summary['documents']
+    tabs = summary['tabs']
+    descriptions = summary['descriptions']
+    unique_users = len(summary['users'])
+
+    return (IntentMatcher()
+        .add('greeting', ['hi', 'hello', 'hey'], ['Hello!', 'Hi there!', 'Welcome to the project management assistant.'])
+        .add('how_are_you', ['how are you'], ['I\'m functioning well, thank you!', 'I\'m operational and ready to assist with your project management.'])
+        .add('name', ['what is your name'], ['I\'m the Project Management Assistant.', 'You can call me the Assistant.'])
+        .add('main_activities', ['what are the main activities of the student'], [f"The main activities are: {activities['Creative']} creative actions, {activities['Viewing']} viewing actions, and {activities['Administrative']} administrative actions."])
+        .add('are_creative', ['are they creative'], [f"Yes, the student has performed {activities['Creative']} creative actions."])
+        .add('are_viewing', ['are they viewing'], [f"Yes, the student has performed {activities['Viewing']} viewing actions."])
+        .add('are_administrative', ['are they administrative'], [f"Yes, the student has performed {activities['Administrative']} administrative actions."])
+        .add('creative_count', ['how many creative actions'], [f"The student has performed {activities['Creative']} creative actions."])
+        .add('viewing_count', ['how many viewing actions'], [f"The student has performed {activities['Viewing']} viewing actions."])
+        .add('administrative_count', ['how many administrative actions'], [f"The student has performed {activities['Administrative']} administrative actions."])
+        .add('goodbye', ['exit', 'bye', 'goodbye'], ['Thank you for using the Project Management Assistant. Goodbye!', 'Farewell! Don\'t hesitate to return if you need more assistance with your project.'])
+        .add('documents', ['what documents were accessed'], [f"The documents accessed were: {', '.join(map(str, documents.keys()))}"])
+        .add('tabs', ['what tabs were used'], [f"The tabs used were: {', '.join(map(str, tabs.keys()))}"])
+        .add('opened_count', ['how many times was the document opened'], [f"The document was opened {descriptions['Open document']} times."])
+        .add('closed_count', ['how many times was the document closed'], [f"The document was closed {descriptions['Close document']} times."])
+        .add('comment_count', ['how many comments were made'], [f"{descriptions['Comment on a Document']} comments were made."])
+        .add('users_count', ['how many users interacted with the document'], [f"{unique_users} unique users interacted with the document."])
+    )
+
+
+def normalize_question(text):
+    return re.sub(r'\s+', ' ', text.strip().lower())
+
+
+# Answers questions about one dataset. Everything is computed when the engine
+# is built: the answers to the predefined questions are stored in a dict, so
+# asking one of them is a single lookup; count questions with a user,
+# document, tab or date range are answered from the CountIndex; other text goes
+# through the intent trie, whose responses are also fixed at build time.
+class ChatEngine:
+    def __init__(self, summary, queries=None):
+        self.summary = summary
+        self.queries = queries
+        self.intents = build_intents(summary)
+        self.answers = {normalize_question(question): self.intents.respond(question) for question in QUESTIONS}
+
+    def respond(self, text):
+        answer = self.answers.get(normalize_question(text))
+        if answer is None and self.queries is not None:
+            answer = self.queries.respond(text)
+        if answer is None:
+            answer = self.intents.respond(text)
+        return answer
+
+
+def initialize_chatbot(table):
+    return ChatEngine(summarize_activity_table(table), CountQueries(table))
@@ -0,0 +1,336 @@
+import re
+from datetime import date, timedelta
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from aggregation import map_reduce
+
+
+# Slots a chatbot question can restrict a count by, besides a date range
+SLOTS = ['User', 'Document', 'Tab', 'ActivityType', 'Event']
+
+# Events a question can count, by the Description of their actions (the same
+# ones the fixed answers count); other actions have no Event
+EVENTS = {
+    'Comment': 'Comment on a Document',
+    'Open': 'Open document',
+    'Close': 'Close document',
+}
+
+EVENT_WORDS = [
+    (re.compile(r'\bcomment(?:s|ed)?\b'), 'Comment'),
+    (re.compile(r'\bopen(?:s|ed)?\b'), 'Open'),
+    (re.compile(r'\bclose(?:s|d)?\b'), 'Close'),
+]
+
+# "how many users/tabs/documents" count the distinct values of a slot
+DISTINCT_WORDS = {
+    'users': 'User',
+    'students': 'User',
+    'tabs': 'Tab',
+    'documents': 'Document',
+}
+
+ACTIVITY_WORDS = {
+    'creative': 'Creative',
+    'viewing': 'Viewing',
+    'administrative': 'Administrative',
+    'admin': 'Administrative',
+    'other': 'Other',
+}
+
+COUNT_CUE = re.compile(r'\b(how many|number of|count)\b')
+
+# What a "how many ..." question counts; questions about anything else are not
+# count questions (e.g. "how many sketches")
+COUNT_TARGET = re.compile(r'\b(?:how many|number of)\s+(?:(?:unique|different|distinct)\s+)?(\w+)')
+COUNTABLE_WORDS = {'actions', 'action', 'activities', 'times', 'comments'} | set(DISTINCT_WORDS) | set(ACTIVITY_WORDS)
+
+EPOCH = date(1970, 1, 1)
+
+
+def day_number(day):
+    return (day - EPOCH).days
+
+
+# Event of each row (see EVENTS), missing for other actions
+def event_column(descriptions):
+    events = {description: event for event, description in EVENTS.items()}
+    return descriptions.map(events).astype(object).where(descriptions.isin(list(events)), None)
+
+
+# Actions per (user, document, tab, activity type, event, day) of one run of rows
+def count_slot_days(table):
+    columns = {slot: table[slot] for slot in SLOTS if slot != 'Event'}
+    columns['Event'] = event_column(table['Description'])
+    days = table['Time'].to_numpy(dtype='datetime64[D]')
+    missing = np.isnat(days)
+    days = days.astype(np.int64)
+    # Rows without a Time count in totals but never in a date range
+    days[missing] = np.iinfo(np.int64).min
+    columns['Day'] = days
+    return (pd.DataFrame({key: np.asarray(values) for key, values in columns.items()})
+            .groupby(SLOTS + ['Day'], dropna=False)
+            .size()
+            .rename('Actions')
+            .reset_index())
+
+
+def merge_slot_days(partials):
+    return (pd.concat(partials, ignore_index=True)
+            .groupby(SLOTS + ['Day'], dropna=False)['Actions']
+            .sum()
+            .reset_index())
+
+
+# Action counts per (user, document, tab, activity type) combination, for every
+# subset of those slots, each with its per-day counts as a sorted day array and
+# running totals. Any count query is then one dict lookup plus two binary
+# searches, whatever the size of the log. The per-day counts of large tables
+# are computed in chunks in the aggregation process pool.
+class CountIndex:
+    def __init__(self, table, workers=None):
+        counts = map_reduce(table, count_slot_days, merge_slot_days, workers)
+
+        self.indexes = {}
+        for size in range(len(SLOTS) + 1):
+            for subset in combinations(SLOTS, size):
+                self.indexes[subset] = self._build(counts, list(subset))
+
+    # One sorted groupby per subset; the groups are runs of its rows, found
+    # where a key changes, and their running totals are slices of one cumsum
+    @staticmethod
+    def _build(counts, subset):
+        per_day = counts.groupby(subset + ['Day'], dropna=False, observed=True)['Actions'].sum()
+        days = per_day.index.get_level_values('Day').to_numpy()
+        actions = per_day.to_numpy()
+        dated = days != np.iinfo(np.int64).min
+        running = np.concatenate(([0], np.cumsum(np.where(dated, actions, 0))))
+        totals = np.concatenate(([0], np.cumsum(actions)))
+
+        change = np.zeros(len(per_day), dtype=bool)
+        change[:1] = True
+        for level in range(len(subset)):
+            codes = per_day.index.codes[level]
+            change[1:] |= codes[1:] != codes[:-1]
+        starts = np.flatnonzero(change)
+        stops = np.append(starts[1:], len(per_day))
+        # Rows without a Time sort first in their group
+        first_dated = starts + ~dated[starts]
+
+        # The key of every group, with None for a missing value
+        keys = [()] * len(starts)
+        if subset:
+            key_columns = []
+            for level in range(len(subset)):
+                # A missing value is a NaN level or code -1 (the last item)
+                values = [None if pd.isna(value) else value for value in per_day.index.levels[level]] + [None]
+                key_columns.append([values[code] for code in per_day.index.codes[level][starts].tolist()])
+            keys = zip(*key_columns)
+
+        index = {}
+        for key, start, stop, first in zip(keys, starts.tolist(), stops.tolist(), first_dated.tolist()):
+            index[key] = (days[first:stop], running[first:stop + 1] - running[first],
+                          int(totals[stop] - totals[start]))
+        return index
+
+    def count(self, user=None, document=None, tab=None, activity=None, event=None, start_date=None, end_date=None):
+        values = dict(zip(SLOTS, [user, document, tab, activity, event]))
+        subset = tuple(slot for slot in SLOTS if values[slot] is not None)
+        entry = self.indexes[subset].get(tuple(values[slot] for slot in subset))
+        if entry is None:
+            return 0
+        return self._range_count(entry, start_date, end_date)
+
+    # Number of distinct values of slot among the matching actions (e.g. the
+    # users who commented last week). Goes through the entries of one subset,
+    # so it grows with the number of value combinations, not of rows.
+    def distinct(self, slot, user=None, document=None, tab=None, activity=None, event=None, start_date=None,
+                 end_date=None):
+        values = dict(zip(SLOTS, [user, document, tab, activity, event]))
+        subset = tuple(other for other in SLOTS if other == slot or values[other] is not None)
+        position = subset.index(slot)
+        wanted = [(i, values[other]) for i, other in enumerate(subset) if values[other] is not None]
+        found = set()
+        for key, entry in self.indexes[subset].items():
+            if key[position] is None or key[position] in found:
+                continue
+            if all(key[i] == value for i, value in wanted) and self._range_count(entry, start_date, end_date):
+                found.add(key[position])
+        return len(found)
+
+    @staticmethod
+    def _range_count(entry, start_date, end_date):
+        days, running, total = entry
+        if start_date is None and end_date is None:
+            return total
+        low = 0 if start_date is None else np.searchsorted(days, day_number(start_date), side='left')
+        high = len(days) if end_date is None else np.searchsorted(days, day_number(end_date), side='right')
+        return int(running[max(high, low)] - running[low])
+
+
+# Finds the known names of one vocabulary (users, documents or tabs) in a
+# question: one compiled alternation, longest names first, on word boundaries
+class NameMatcher:
+    def __init__(self, names):
+        self.names = {}
+        for name in names:
+            if name is not None and not pd.isna(name) and str(name).strip():
+                self.names.setdefault(str(name).lower(), name)
+        alternatives = sorted(self.names, key=len, reverse=True)
+        self.pattern = re.compile(
+            r'(?<!\w)(' + '|'.join(re.escape(name) for name in alternatives) + r')(?!\w)'
+        ) if alternatives else None
+
+    def find(self, text, taken):
+        if self.pattern is None:
+            return None
+        for match in self.pattern.finditer(text):
+            span = set(range(*match.span()))
+            if not span & taken:
+                taken |= span
+                return self.names[match.group(1)]
+        return None
+
+
+ISO_DATE = r'(\d{4}-\d{2}-\d{2})'
+
+
+def _parse_date(text):
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+# Date range named in a question, relative to today where needed
+def extract_date_range(text, today):
+    match = re.search(rf'\b(?:between|from)\s+{ISO_DATE}\s+(?:and|to|until)\s+{ISO_DATE}', text)
+    if match:
+        return _parse_date(match.group(1)), _parse_date(match.group(2))
+    match = re.search(rf'\b(?:since|after|from)\s+{ISO_DATE}', text)
+    if match:
+        return _parse_date(match.group(1)), today
+    match = re.search(rf'\b(?:before|until)\s+{ISO_DATE}', text)
+    if match:
+        return None, _parse_date(match.group(1))
+    match = re.search(ISO_DATE, text)
+    if match:
+        day = _parse_date(match.group(1))
+        return day, day
+    match = re.search(r'\b(?:last|past)\s+(\d+)\s+days?\b', text)
+    if match:
+        return today - timedelta(days=int(match.group(1)) - 1), today
+    if re.search(r'\btoday\b', text):
+        return today, today
+    if re.search(r'\byesterday\b', text):
+        return today - timedelta(days=1), today - timedelta(days=1)
+    week_start = today - timedelta(days=today.weekday())
+    if re.search(r'\bthis week\b', text):
+        return week_start, today
+    if re.search(r'\blast week\b', text):
+        return week_start - timedelta(days=7), week_start - timedelta(days=1)
+    month_start = today.replace(day=1)
+    if re.search(r'\bthis month\b', text):
+        return month_start, today
+    if re.search(r'\blast month\b', text):
+        previous_end = month_start - timedelta(days=1)
+        return previous_end.replace(day=1), previous_end
+    return None
+
+
+# Count questions with slots, e.g. "how many creative actions did StudentB do
+# in Assembly 3 last week". Parses the question, answers it from the
+# CountIndex, and returns None for questions that are not such counts.
+class CountQueries:
+    def __init__(self, table, today=None):
+        self.index = CountIndex(table)
+        self.today = today
+        self.matchers = {slot: NameMatcher(table[slot].cat.categories) for slot in ['User', 'Document', 'Tab']}
+
+    def parse(self, text):
+        text = text.lower()
+        if not COUNT_CUE.search(text):
+            return None
+        taken = set()
+        slots = {slot: matcher.find(text, taken) for slot, matcher in self.matchers.items()}
+        # What is counted is read from the rest of the question, so a name like
+        # "Open Studio" is not taken for an event
+        rest = ''.join(' ' if i in taken else char for i, char in enumerate(text))
+        target = COUNT_TARGET.search(rest)
+        if target is not None and target.group(1) not in COUNTABLE_WORDS:
+            return None
+        distinct = DISTINCT_WORDS.get(target.group(1)) if target is not None else None
+        event = next((event for pattern, event in EVENT_WORDS if pattern.search(rest)), None)
+        activity = None
+        for word, activity_type in ACTIVITY_WORDS.items():
+            if re.search(rf'\b{word}\b', rest):
+                activity = activity_type
+                break
+        date_range = extract_date_range(text, self.today or date.today())
+        if not any(slots.values()) and date_range is None:
+            # Plain global counts are left to the fixed answers
+            return None
+        start_date, end_date = date_range or (None, None)
+        return {
+            'distinct': distinct,
+            'user': slots['User'],
+            'document': slots['Document'],
+            'tab': slots['Tab'],
+            'activity': activity,
+            'event': event,
+            'start_date': start_date,
+            'end_date': end_date,
+        }
+
+    def respond(self, text):
+        query = self.parse(text)
+        if query is None:
+            return None
+        values = {key: value for key, value in query.items() if key != 'distinct'}
+        if query['distinct'] is not None:
+            count = self.index.distinct(query['distinct'], **values)
+        else:
+            count = self.index.count(**values)
+        return describe_count(query, count)
+
+
+EVENT_VERBS = {'Comment': 'commented', 'Open': 'opened the document', 'Close': 'closed the document'}
+DISTINCT_NOUNS = {'User': 'users', 'Tab': 'tabs', 'Document': 'documents'}
+
+
+def describe_count(query, count):
+    user, document, event, activity = query['user'], query['document'], query['event'], query['activity']
+    where = []
+    if document is not None and not (event in ('Open', 'Close') and query['distinct'] is None):
+        where.append(f"in document '{document}'")
+    if query['tab'] is not None:
+        where.append(f"in tab '{query['tab']}'")
+    start_date, end_date = query['start_date'], query['end_date']
+    if start_date and end_date:
+        where.append(f"on {start_date}" if start_date == end_date else f"between {start_date} and {end_date}")
+    elif start_date:
+        where.append(f"since {start_date}")
+    elif end_date:
+        where.append(f"until {end_date}")
+
+    subject = str(user) if user is not None else "The students"
+    if query['distinct'] == 'User':
+        done = EVENT_VERBS[event] if event else f"performed {activity.lower()} actions" if activity else "were active"
+        answer = f"{count} unique users {done}"
+    elif query['distinct'] is not None:
+        answer = f"{count} unique {DISTINCT_NOUNS[query['distinct']]} were used"
+        if user is not None:
+            answer += f" by {user}"
+    elif event == 'Comment':
+        answer = f"{subject} made {count} comments"
+    elif event is not None:
+        verb = 'opened' if event == 'Open' else 'closed'
+        opened = f"Document '{document}'" if document is not None else "The document"
+        answer = f"{opened} was {verb} {count} times" + (f" by {user}" if user is not None else "")
+    else:
+        actions = f"{activity.lower()} actions" if activity else "actions"
+        answer = f"{subject} performed {count} {actions}"
+    return " ".join([answer] + where) + "."
@@ -0,0 +1,113 @@
+import importlib.util
+import io
+
+import pandas as pd
+
+from activity_table import TIME_FORMAT
+
+
+# Download formats offered on the Parameters Results screen:
+# label -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    'Excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/octet-stream'),
+}
+
+EXCEL_DATE_FORMAT = 'yyyy-mm-dd hh:mm:ss'
+
+# Rows converted to Python values at a time while writing a workbook
+CHUNK_ROWS = 10000
+
+
+# Runs of CHUNK_ROWS rows of the table, or of its rows with the given ids
+def iter_chunks(table, rows=None, chunk_rows=CHUNK_ROWS):
+    n_rows = len(table) if rows is None else len(rows)
+    for start in range(0, n_rows, chunk_rows):
+        yield table.iloc[start:start + chunk_rows] if rows is None else table.iloc[rows[start:start + chunk_rows]]
+
+
+# Rows of the table as lists of plain Python values (missing values as None),
+# converted one chunk at a time so only CHUNK_ROWS rows exist as objects at once
+def iter_rows(table, rows=None, chunk_rows=CHUNK_ROWS):
+    for chunk in iter_chunks(table, rows, chunk_rows):
+        columns = []
+        for column in chunk.columns:
+            values = chunk[column]
+            if pd.api.types.is_datetime64_any_dtype(values.dtype):
+                converted = [None if pd.isna(value) else value.to_pydatetime() for value in values]
+            else:
+                converted = values.astype(object).where(values.notna(), None).tolist()
+            columns.append(converted)
+        yield from (list(row) for row in zip(*columns))
+
+
+# Workbook with one sheet of the table. xlsxwriter in constant_memory mode
+# flushes each row to a temporary file as soon as the next one starts, so
+# memory stays flat however many rows there are; without xlsxwriter,
+# openpyxl's write-only mode streams the rows the same way.
+def export_excel(table, rows=None):
+    output = io.BytesIO()
+    try:
+        import xlsxwriter
+    except ImportError:
+        xlsxwriter = None
+
+    if xlsxwriter is not None:
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True,
+                                                'default_date_format': EXCEL_DATE_FORMAT})
+        worksheet = workbook.add_worksheet('Sheet1')
+        worksheet.write_row(0, 0, [str(column) for column in table.columns])
+        for number, row in enumerate(iter_rows(table, rows), start=1):
+            worksheet.write_row(number, 0, row)
+        workbook.close()
+    else:
+        from openpyxl import Workbook
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet('Sheet1')
+        worksheet.append([str(column) for column in table.columns])
+        for row in iter_rows(table, rows):
+            worksheet.append(row)
+        workbook.save(output)
+    return output.getvalue()
+
+
+# Written a chunk of rows at a time, the header with the first one
+def export_csv(table, rows=None):
+    output = io.StringIO()
+    for number, chunk in enumerate(iter_chunks(table, rows)):
+        chunk.to_csv(output, index=False, header=number == 0, date_format=TIME_FORMAT)
+    if output.tell() == 0:
+        table.iloc[:0].to_csv(output, index=False)
+    return output.getvalue().encode('utf-8')
+
+
+# Parquet keeps the column types, including the categorical columns (without
+# the categories the selected rows do not use). The writer needs the rows as
+# one table, so a selection is copied for the time of the export.
+def export_parquet(table, rows=None):
+    from filter_engine import select_rows
+
+    output = io.BytesIO()
+    (table if rows is None else select_rows(table, rows)).to_parquet(output, index=False)
+    return output.getvalue()
+
+
+EXPORTERS = {
+    'Excel': export_excel,
+    'CSV': export_csv,
+    'Parquet': export_parquet,
+}
+
+
+# Formats whose writer is installed (Parquet needs pyarrow or fastparquet)
+def available_formats():
+    formats = ['Excel', 'CSV']
+    if importlib.util.find_spec('pyarrow') or importlib.util.find_spec('fastparquet'):
+        formats.append('Parquet')
+    return formats
+
+
+# The table, or only its rows with the given ids, in one of the EXPORT_FORMATS
+def export_table(table, export_format, rows=None):
+    return EXPORTERS[export_format](table, rows)
@@ -0,0 +1,376 @@
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+PUSH_CHARS = '-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz'
+_push_lock = threading.Lock()
+_last_push_time = 0
+_last_random = []
+
+
+# Child keys generated for POST, in the same format as Firebase push IDs: 8 characters of millisecond timestamp + 12 random ones
+# (incremented instead of re-drawn within the same millisecond).
+def make_push_id():
+    global _last_push_time, _last_random
+    with _push_lock:
+        now = int(time.time() * 1000)
+        if now == _last_push_time:
+            i = 11
+            while i >= 0 and _last_random[i] == 63:
+                _last_random[i] = 0
+                i -= 1
+            if i >= 0:
+                _last_random[i] += 1
+        else:
+            _last_push_time = now
+            _last_random = [random.randrange(64) for _ in range(12)]
+
+        time_chars = []
+        for _ in range(8):
+            time_chars.append(PUSH_CHARS[now % 64])
+            now //= 64
+        return ''.join(reversed(time_chars)) + ''.join(PUSH_CHARS[n] for n in _last_random)
+
+
+# Local stand-in for the Firebase Realtime Database REST API, so the app's
+# storage code can be exercised offline:
+#
+#   server = FakeFirebaseServer().start()
+#   history_store.load_index(server.url)
+#   server.stop()
+#
+# It keeps one JSON tree in memory and serves "<path>.json" URLs with the same
+# semantics the app relies on: GET (optionally ?shallow=true), PUT, PATCH
+# (including atomic multi-path updates), POST (push IDs) and DELETE, "null"
+# for missing nodes and integer-keyed objects returned as arrays. Also:
+#
+# - queries: orderBy ("$key", "$value" or a child path) with startAt, endAt,
+#   equalTo, limitToFirst and limitToLast, in Firebase's sort order;
+# - ETags: GET with "X-Firebase-ETag: true" returns the node's ETag, a GET
+#   with a matching if-none-match gets 304, and a PUT or DELETE whose if-match
+#   is not the current ETag gets 412 with the current value.
+class FakeFirebaseServer:
+    def __init__(self, host='127.0.0.1', port=0, data=None):
+        self.root = _normalize(data) or {}
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def get(self, path, shallow=False, query=None):
+        with self.lock:
+            node = _get_node(self.root, path)
+        if query:
+            return _run_query(node, **query)
+        value = _firebase_value(node)
+        if shallow and isinstance(value, (dict, list)):
+            keys = value.keys() if isinstance(value, dict) else (str(i) for i, v in enumerate(value) if v is not None)
+            return {key: True for key in keys}
+        return value
+
+    def etag(self, path):
+        with self.lock:
+            return make_etag(_firebase_value(_get_node(self.root, path)))
+
+    # if_match: the ETag the node must still have, or PreconditionFailed
+    def put(self, path, value, if_match=None):
+        with self.lock:
+            self._check_etag(path, if_match)
+            self.root = _set_node(self.root, path, value)
+        return value
+
+    # Every key of the update may be a relative path; all of them are applied
+    # under one lock, so readers never see half of a multi-path update
+    def patch(self, path, update):
+        if not isinstance(update, dict):
+            raise ValueError("PATCH body must be an object")
+        with self.lock:
+            for child_path, value in update.items():
+                self.root = _set_node(self.root, f"{path}/{child_path}", value)
+        return update
+
+    def post(self, path, value):
+        key = make_push_id()
+        with self.lock:
+            self.root = _set_node(self.root, f"{path}/{key}", value)
+        return {'name': key}
+
+    def delete(self, path, if_match=None):
+        with self.lock:
+            self._check_etag(path, if_match)
+            self.root = _set_node(self.root, path, None)
+
+    def _check_etag(self, path, if_match):
+        if if_match is not None:
+            current = _firebase_value(_get_node(self.root, path))
+            if make_etag(current) != if_match:
+                raise PreconditionFailed(current)
+
+
+class PreconditionFailed(Exception):
+    def __init__(self, value):
+        super().__init__("ETag mismatch")
+        self.value = value
+
+
+def make_etag(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+def _split(path):
+    return [part for part in path.strip('/').split('/') if part]
+
+
+def _get_node(root, path):
+    node = root
+    for part in _split(path):
+        if not isinstance(node, dict) or part not in node:
+            return None
+        node = node[part]
+    return node
+
+
+# Returns the new root; setting a node to None deletes it and prunes empty parents
+def _set_node(root, path, value):
+    parts = _split(path)
+    if not parts:
+        return _normalize(value)
+    node = root if isinstance(root, dict) else {}
+    child = _set_node(node.get(parts[0]), '/'.join(parts[1:]), value)
+    node = dict(node)
+    if child is None or child == {}:
+        node.pop(parts[0], None)
+    else:
+        node[parts[0]] = child
+    return node or None
+
+
+# Firebase stores everything as objects with string keys
+def _normalize(value):
+    if isinstance(value, list):
+        value = {str(i): v for i, v in enumerate(value)}
+    if isinstance(value, dict):
+        normalized = {str(k): _normalize(v) for k, v in value.items()}
+        normalized = {k: v for k, v in normalized.items() if v is not None and v != {}}
+        return normalized or None
+    return value
+
+
+# ...and returns objects whose keys are mostly array indexes as arrays
+def _firebase_value(value):
+    if not isinstance(value, dict):
+        return value
+    value = {k: _firebase_value(v) for k, v in value.items()}
+    if value and all(k.isdigit() for k in value):
+        highest = max(int(k) for k in value)
+        if len(value) * 2 > highest + 1:
+            return [value.get(str(i)) for i in range(highest + 1)]
+    return value
+
+
+# Firebase's sort order of values: null, false, true, numbers, strings, objects
+def _value_order(value):
+    if value is None:
+        return (0,)
+    if value is False:
+        return (1,)
+    if value is True:
+        return (2,)
+    if isinstance(value, (int, float)):
+        return (3, value)
+    if isinstance(value, str):
+        return (4, value)
+    return (5,)
+
+
+# ...and of keys: the ones that are 32-bit integers first, numerically
+def _key_order(key):
+    if re.fullmatch(r'-?\d+', key) and -2 ** 31 <= int(key) < 2 ** 31:
+        return (0, int(key), '')
+    return (1, 0, key)
+
+
+# Children of a node selected and ordered like a Firebase query, returned as an object
+def _run_query(node, order_by, start_at=None, end_at=None, equal_to=None, limit_first=None, limit_last=None):
+    if not isinstance(node, dict):
+        return _firebase_value(node)
+    if order_by == '$key':
+        def order(key, child):
+            return _key_order(key)
+        def bound(value):
+            return _key_order(str(value))
+    else:
+        def order(key, child):
+            value = child if order_by == '$value' else _get_node(child, order_by) if isinstance(child, dict) else None
+            return _value_order(value) + (_key_order(key),)
+        bound = _value_order
+
+    items = sorted(node.items(), key=lambda item: order(*item))
+    if equal_to is not None:
+        start_at = end_at = equal_to
+    if start_at is not None:
+        items = [item for item in items if order(*item)[:len(bound(start_at))] >= bound(start_at)]
+    if end_at is not None:
+        items = [item for item in items if order(*item)[:len(bound(end_at))] <= bound(end_at)]
+    if limit_first is not None:
+        items = items[:limit_first]
+    if limit_last is not None:
+        items = items[-limit_last:] if limit_last else []
+    return {key: _firebase_value(child) for key, child in items} or None
+
+
+QUERY_PARAMS = {'orderBy': 'order_by', 'startAt': 'start_at', 'endAt': 'end_at', 'equalTo': 'equal_to',
+                'limitToFirst': 'limit_first', 'limitToLast': 'limit_last'}
+
+
+# The query of a GET, with the errors Firebase gives for the ones it rejects
+def _parse_query(query):
+    parsed = {}
+    for name, argument in QUERY_PARAMS.items():
+        if name in query:
+            try:
+                parsed[argument] = json.loads(query[name][0])
+            except ValueError:
+                raise QueryError(f"Invalid {name} parameter")
+    if not parsed:
+        return None
+    if 'order_by' not in parsed:
+        raise QueryError("orderBy must be defined when other query parameters are defined")
+    if 'shallow' in query:
+        raise QueryError("Mixing shallow with other query parameters is not supported")
+    if 'limit_first' in parsed and 'limit_last' in parsed:
+        raise QueryError("Only one of limitToFirst and limitToLast may be specified")
+    for argument in ('limit_first', 'limit_last'):
+        if argument in parsed and (not isinstance(parsed[argument], int) or parsed[argument] < 0):
+            raise QueryError("Limits must be non-negative integers")
+    if not isinstance(parsed['order_by'], str) or parsed['order_by'] == '$priority':
+        raise QueryError("orderBy must be \"$key\", \"$value\" or a child path")
+    return parsed
+
+
+class QueryError(ValueError):
+    pass
+
+
+def _make_handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _path_and_query(self):
+            parts = urlsplit(self.path)
+            path = parts.path
+            if not path.endswith('.json'):
+                return None, None
+            return path[:-len('.json')], parse_qs(parts.query)
+
+        def _read_body(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            return json.loads(self.rfile.read(length) or b'null')
+
+        def _reply(self, status, value, etag=None):
+            body = json.dumps(value).encode('utf-8') if status != 304 else b''
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            if etag is not None:
+                self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _handle(self, method):
+            path, query = self._path_and_query()
+            if path is None:
+                self._reply(404, {'error': 'Paths must end in .json'})
+                return
+            if_match = self.headers.get('if-match')
+            try:
+                if method == 'GET':
+                    shallow = query.get('shallow', ['false'])[0] == 'true'
+                    value = server.get(path, shallow=shallow, query=_parse_query(query))
+                    if self.headers.get('X-Firebase-ETag', '').lower() == 'true':
+                        etag = make_etag(value)
+                        status = 304 if self.headers.get('if-none-match') == etag else 200
+                        self._reply(status, value, etag)
+                    else:
+                        self._reply(200, value)
+                elif method == 'PUT':
+                    self._reply(200, server.put(path, self._read_body(), if_match))
+                elif method == 'PATCH':
+                    self._reply(200, server.patch(path, self._read_body()))
+                elif method == 'POST':
+                    self._reply(200, server.post(path, self._read_body()))
+                elif method == 'DELETE':
+                    server.delete(path, if_match)
+                    self._reply(200, None)
+            except PreconditionFailed as e:
+                self._reply(412, e.value, make_etag(e.value))
+            except QueryError as e:
+                self._reply(400, {'error': str(e)})
+            except ValueError:
+                self._reply(400, {'error': 'Invalid data; couldn\'t parse JSON object.'})
+
+        def do_GET(self):
+            self._handle('GET')
+
+        def do_PUT(self):
+            self._handle('PUT')
+
+        def do_PATCH(self):
+            self._handle('PATCH')
+
+        def do_POST(self):
+            self._handle('POST')
+
+        def do_DELETE(self):
+            self._handle('DELETE')
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local Firebase Realtime Database stand-in")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--seed', help="JSON file to load as the initial database content")
+    args = parser.parse_args()
+
+    seed = None
+    if args.seed:
+        with open(args.seed, 'r', encoding='utf-8') as f:
+            seed = json.load(f)
+
+    server = FakeFirebaseServer(args.host, args.port, seed)
+    print(f"Fake Firebase listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
@@ -0,0 +1,180 @@
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from activity_table import TIME_FORMAT
+
+
+# Original row-by-row filter over the raw records. Kept as the reference for
+# the semantics FilterIndex reproduces, and as the benchmark baseline.
+def filter_json_data(json_data, filters, start_date=None, end_date=None):
+    filtered_data = []
+    if not filters and not start_date and not end_date:
+        return json_data
+    for item in json_data:
+        match = True
+        for key, value in filters.items():
+            if key in item:
+                item_value = str(item[key])
+                if value.lower() not in item_value.lower():  # Substring match
+                    match = False
+                    break
+        if start_date and end_date:
+            item_date = item.get('Time')
+            if item_date:
+                item_date = datetime.strptime(item_date, TIME_FORMAT)
+                if not (start_date <= item_date.date() <= end_date):
+                    match = False
+        if match:
+            filtered_data.append(item)
+    return filtered_data
+
+
+# Trigram index over the distinct lowercased values of a column. A substring
+# query only verifies the values that contain all of its trigrams; queries
+# shorter than a trigram check every distinct value.
+class NgramIndex:
+    def __init__(self, values, n=3):
+        self.values = values
+        self.n = n
+        postings = defaultdict(set)
+        for i, text in enumerate(values):
+            for j in range(len(text) - n + 1):
+                postings[text[j:j + n]].add(i)
+        self.postings = dict(postings)
+
+    # Positions of the values containing needle, in increasing order
+    def search(self, needle):
+        if len(needle) < self.n:
+            candidates = range(len(self.values))
+        else:
+            grams = {needle[j:j + self.n] for j in range(len(needle) - self.n + 1)}
+            posting_lists = sorted((self.postings.get(gram, set()) for gram in grams), key=len)
+            candidates = sorted(set.intersection(*posting_lists))
+        return [i for i in candidates if needle in self.values[i]]
+
+
+# Row ids of every value of a categorical column, from one stable sort of the
+# codes. rows(code) is a slice of that sort; code -1 gives the missing values.
+class ValueRows:
+    def __init__(self, codes, n_values):
+        self.order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes + 1, minlength=n_values + 1)
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def rows(self, code):
+        return self.order[self.offsets[code + 1]:self.offsets[code + 2]]
+
+
+# Vectorized version of filter_json_data over an activity table. The lowercased
+# text of a column is prepared once per dataset (on its first use), and each
+# filter is then a boolean mask over all rows:
+#
+# - Categorical columns are matched through a trigram index over their distinct
+#   values, and the rows of the matching values are read from per-value row id
+#   lists, so the work grows with the number of distinct values and matching
+#   rows rather than with the size of the log.
+# - Other columns are matched with one vectorized str.contains.
+# - The date range is two integer comparisons on the parsed Time column.
+#
+# Same semantics as filter_json_data for the values the records have:
+# case-insensitive substring matches, rows without the filtered field or
+# without a Time pass, and the date range is only applied when both ends are
+# given. Two differences:
+#
+# - The table does not tell a field set to null from a missing one, so a null
+#   passes every filter like a missing field. filter_json_data matched it as
+#   the text "None" (so {'User': 'a'} left it out, {'User': 'no'} kept it).
+# - Rows whose Time does not parse made filter_json_data raise; they are
+#   rejected when the activity table is built, so they never reach the filters.
+class FilterIndex:
+    def __init__(self, table):
+        self.table = table
+        self.n_rows = len(table)
+        self.columns = {}
+        self.column_bytes = {}
+
+        # Time is already parsed by the activity table
+        self.times = table['Time'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        self.missing_times = table['Time'].isna().to_numpy()
+
+    # Lowercased text of a column, prepared on first use and then reused
+    def column(self, name):
+        if name not in self.columns:
+            values = self.table[name]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                lowered = [str(c).lower() for c in values.cat.categories]
+                codes = values.cat.codes.to_numpy()
+                value_rows = ValueRows(codes, len(lowered))
+                self.columns[name] = ('categorical', NgramIndex(lowered), value_rows)
+                # The distinct values and their trigrams are small next to the row ids
+                self.column_bytes[name] = value_rows.order.nbytes + value_rows.offsets.nbytes
+            else:
+                if pd.api.types.is_datetime64_any_dtype(values.dtype):
+                    # Match against the original text form of the timestamps
+                    text = values.dt.strftime(TIME_FORMAT)
+                else:
+                    text = values.astype(str)
+                lowered = text.str.lower()
+                self.columns[name] = ('text', lowered.to_numpy(dtype=object), values.isna().to_numpy())
+                self.column_bytes[name] = int(lowered.memory_usage(deep=True, index=False)) + self.n_rows
+        return self.columns[name]
+
+    # Memory of the prepared columns and times, not counting the table itself
+    def memory_bytes(self):
+        return self.times.nbytes + self.missing_times.nbytes + sum(self.column_bytes.values())
+
+    def mask(self, filters, start_date=None, end_date=None):
+        mask = np.ones(self.n_rows, dtype=bool)
+        if not filters and not start_date and not end_date:
+            return mask
+        for key, value in filters.items():
+            if key in self.table.columns:
+                mask &= self.substring_mask(key, value)
+        if start_date and end_date:
+            mask &= self.date_mask(start_date, end_date)
+        return mask
+
+    # Rows whose value contains value, ignoring case. Missing values pass like
+    # a record without the field unless keep_missing is False.
+    def substring_mask(self, column, value, keep_missing=True):
+        needle = value.lower()
+        kind, index, extra = self.column(column)
+        if kind == 'categorical':
+            value_rows = extra
+            mask = np.zeros(self.n_rows, dtype=bool)
+            codes = index.search(needle)
+            if keep_missing:
+                codes = [-1] + codes
+            for code in codes:
+                mask[value_rows.rows(code)] = True
+            return mask
+        lowered, missing = index, extra
+        hits = pd.Series(lowered, dtype=object).str.contains(needle, regex=False).to_numpy(dtype=bool)
+        return hits | missing if keep_missing else hits & ~missing
+
+    def date_mask(self, start_date, end_date):
+        start = pd.Timestamp(start_date).value
+        end = (pd.Timestamp(end_date) + pd.Timedelta(days=1)).value
+        return ((self.times >= start) & (self.times < end)) | self.missing_times
+
+
+# Positions of the rows a mask selects, as a compact array (4 bytes a row, or
+# nothing for rows that do not match) that can be kept per session in place of
+# a copy of the rows
+def row_ids(mask):
+    dtype = np.int32 if len(mask) <= np.iinfo(np.int32).max else np.int64
+    return np.flatnonzero(mask).astype(dtype, copy=False)
+
+
+# Rows of the table selected by a mask or by row ids, with categories that no
+# longer occur dropped so counts and charts only show values present in the
+# selection
+def select_rows(table, rows):
+    selected = table.iloc[rows].reset_index(drop=True)
+    for column in selected.columns:
+        if isinstance(selected[column].dtype, pd.CategoricalDtype):
+            selected[column] = selected[column].cat.remove_unused_categories()
+    return selected
@@ -0,0 +1,118 @@
+import json
+import os
+import threading
+import time
+
+import requests
+
+from instrumentation import span
+
+
+# Keeps the latest copy of a Firebase node in memory and refreshes it in a
+# background thread, so Streamlit reruns never wait on the network.
+#
+# - A fresh value (younger than ttl seconds) is served straight from memory.
+# - A stale value is still served immediately; a background thread revalidates
+#   it with a conditional GET (ETag / if-none-match), so an unchanged node costs
+#   a 304 with an empty body.
+# - Every successful download is written to an on-disk snapshot that is used on
+#   the next cold start. Only a cold start without a snapshot blocks on the
+#   first fetch; with block_first=False even that (and reading the snapshot)
+#   happens in the background and get() returns None until it is done.
+class CachedFirebaseLoader:
+    def __init__(self, url, snapshot_path, ttl=60, timeout=10, block_first=True):
+        self.url = url
+        self.snapshot_path = snapshot_path
+        self.ttl = ttl
+        self.timeout = timeout
+        self.block_first = block_first
+
+        self.etag = None
+        self.fetched_at = 0.0
+        self.last_error = None
+        self._value = None
+        self._has_value = False
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+        if block_first:
+            self._load_snapshot()
+
+    @property
+    def has_value(self):
+        return self._has_value
+
+    def get(self):
+        if not self._has_value and not self.block_first:
+            self._refresh_in_background()
+        elif not self._has_value:
+            # Nothing in memory or on disk yet, the very first fetch has to block
+            self.refresh()
+        elif time.time() - self.fetched_at > self.ttl:
+            self._refresh_in_background()
+        return self._value
+
+    def refresh(self):
+        if not self._has_value and not self.block_first:
+            self._load_snapshot()
+        headers = {'X-Firebase-ETag': 'true'}
+        if self.etag and self._has_value:
+            headers['if-none-match'] = self.etag
+        try:
+            with span('firebase fetch'):
+                response = requests.get(self.url, headers=headers, timeout=self.timeout)
+                data = response.json() if response.status_code == 200 else None
+            if response.status_code == 304:
+                self.fetched_at = time.time()
+                self.last_error = None
+            elif response.status_code == 200:
+                self._set_value(data, response.headers.get('ETag'), time.time())
+                self.last_error = None
+                self._save_snapshot(data)
+            else:
+                self.last_error = f"HTTP {response.status_code}"
+        except (requests.RequestException, ValueError) as e:
+            self.last_error = str(e)
+        finally:
+            if not self._has_value:
+                # Serve "no data" until the next retry after ttl instead of
+                # retrying on every rerun against an unreachable database
+                self._set_value(None, None, time.time())
+            self._refreshing = False
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self.refresh, daemon=True).start()
+
+    def _set_value(self, data, etag, fetched_at):
+        with self._lock:
+            self._value = data
+            self._has_value = True
+            self.etag = etag
+            self.fetched_at = fetched_at
+
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            # Taken from another database (the URL is configurable)
+            if snapshot.get('url', self.url) != self.url:
+                return
+            # The snapshot is served as-is but counts as stale so it is revalidated
+            self._set_value(snapshot['data'], snapshot.get('etag'), 0.0)
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _save_snapshot(self, data):
+        snapshot = {'url': self.url, 'etag': self.etag, 'saved_at': time.time(), 'data': data}
+        tmp_path = self.snapshot_path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            self.last_error = f"Could not write snapshot: {e}"
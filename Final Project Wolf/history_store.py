@@ -0,0 +1,218 @@
+import argparse
+import codecs
+import hashlib
+import io
+import json
+import os
+
+import requests
+
+from json_stream import CHUNK_BYTES, iter_json_records
+
+
+# Layout of the upload history database:
+#
+#   /uploads_index/<hash>   = {"filename", "timestamp", "hash", "rows"}   (small)
+#   /uploads_payload/<hash> = [ ...activity records... ]                  (large)
+#
+# <hash> is the content hash of the records, so the index doubles as an O(1)
+# lookup for duplicate detection and selection, and the same log uploaded
+# under another name is stored only once. The admin page only reads the index
+# to fill the file selectbox; a payload is downloaded only when its file is
+# selected.
+INDEX_NODE = 'uploads_index'
+PAYLOAD_NODE = 'uploads_payload'
+
+REQUEST_TIMEOUT = 30
+
+
+def node_url(base_url, path=''):
+    return f"{base_url.rstrip('/')}/{path.strip('/')}.json"
+
+
+# SHA-256 of records serialized in a canonical form (sorted keys, no spaces),
+# fed one record at a time so a stream of records can be hashed as it is read
+class ContentHasher:
+    def __init__(self):
+        self.digest = hashlib.sha256()
+        self.digest.update(b'[')
+        self.rows = 0
+
+    def update(self, record):
+        if self.rows:
+            self.digest.update(b',')
+        self.digest.update(json.dumps(record, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+        self.rows += 1
+
+    def hexdigest(self):
+        digest = self.digest.copy()
+        digest.update(b']')
+        return digest.hexdigest()
+
+
+def content_hash(records):
+    hasher = ContentHasher()
+    for record in records:
+        hasher.update(record)
+    return hasher.hexdigest()
+
+
+def load_index(base_url):
+    response = requests.get(node_url(base_url, INDEX_NODE), timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.json() or {}
+
+
+# Read-only file over a streamed response body. It reads through iter_content
+# rather than response.raw, so a dropped or timed-out download raises a
+# requests exception (not a urllib3 one) that the callers already handle.
+class _ResponseFile:
+    def __init__(self, response, chunk_bytes=CHUNK_BYTES):
+        self.chunks = response.iter_content(chunk_size=chunk_bytes)
+
+    def read(self, size=-1):
+        return next(self.chunks, b'')
+
+
+# Records of a stored upload, parsed from the response as it downloads
+def iter_payload(base_url, key):
+    with requests.get(node_url(base_url, f"{PAYLOAD_NODE}/{key}"), stream=True, timeout=REQUEST_TIMEOUT) as response:
+        response.raise_for_status()
+        yield from iter_json_records(_ResponseFile(response))
+
+
+# Key of the dataset made of the uploads under keys: the upload's own key for a
+# single file, a hash of the sorted keys for a union of several
+def dataset_key(keys):
+    keys = sorted(keys)
+    if len(keys) == 1:
+        return keys[0]
+    return 'union-' + hashlib.sha256(','.join(keys).encode('utf-8')).hexdigest()
+
+
+# Index entries ordered by upload time, oldest first
+def sorted_index_keys(index):
+    return sorted(index, key=lambda key: (index[key].get('timestamp', ''), key))
+
+
+def make_index_entry(filename, timestamp, records, digest=None, rows=None):
+    return {
+        "filename": filename,
+        "timestamp": timestamp,
+        "hash": digest or content_hash(records),
+        "rows": len(records) if rows is None else rows,
+    }
+
+
+# Append-only upload: the index entry and the payload are written under the
+# content hash in one atomic multi-path PATCH. The request carries only this
+# upload's bytes and never touches other children, so concurrent uploads from
+# several sessions cannot overwrite each other (two sessions uploading the
+# same content write the same child).
+def save_upload(base_url, filename, timestamp, records, digest=None):
+    entry = make_index_entry(filename, timestamp, records, digest)
+    key = entry['hash']
+    update = {
+        f"{INDEX_NODE}/{key}": entry,
+        f"{PAYLOAD_NODE}/{key}": records,
+    }
+    response = requests.patch(node_url(base_url), json.dumps(update), timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return key, entry
+
+
+# Request body made of byte strings and the rest of a file, read as it is sent.
+# The length is known up front, so the request goes out with a Content-Length.
+class _ConcatenatedBody:
+    def __init__(self, head, file, tail):
+        start = file.tell()
+        file.seek(0, os.SEEK_END)
+        self.length = len(head) + file.tell() - start + len(tail)
+        file.seek(start)
+        self.parts = [io.BytesIO(head), file, io.BytesIO(tail)]
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(io.DEFAULT_BUFFER_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    def read(self, size=-1):
+        chunks = []
+        while self.parts and size != 0:
+            chunk = self.parts[0].read(size)
+            if not chunk:
+                self.parts.pop(0)
+                continue
+            chunks.append(chunk)
+            if size > 0:
+                size -= len(chunk)
+        return b''.join(chunks)
+
+
+# save_upload for an uploaded JSON file that has already been parsed (and
+# hashed) as a stream: the file's own bytes are sent as the payload instead of
+# re-serializing the records, so the upload never holds them in memory.
+def save_upload_file(base_url, filename, timestamp, file, digest, rows):
+    entry = make_index_entry(filename, timestamp, None, digest, rows)
+    key = entry['hash']
+    head = '{%s:%s,%s:' % (json.dumps(f"{INDEX_NODE}/{key}"), json.dumps(entry),
+                           json.dumps(f"{PAYLOAD_NODE}/{key}"))
+    file.seek(0)
+    if file.read(len(codecs.BOM_UTF8)) != codecs.BOM_UTF8:
+        file.seek(0)
+    body = _ConcatenatedBody(head.encode('utf-8'), file, b'}')
+    response = requests.patch(node_url(base_url), data=body, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return key, entry
+
+
+# The old layout stored the whole history as one list at the database root,
+# each entry carrying its full "data" array. Move those entries into the
+# index/payload layout so they stay selectable. A root entry is deleted only
+# once its records are in the new layout; other root keys are left alone.
+# Run it once, by hand, against the history database:
+#
+#   python history_store.py migrate https://<database>.firebasedatabase.app
+def migrate_legacy_history(base_url):
+    response = requests.get(node_url(base_url), params={'shallow': 'true'}, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    root_keys = response.json() or {}
+    legacy_keys = sorted((key for key in root_keys if key.isdigit()), key=int)
+    if not legacy_keys:
+        return 0
+
+    index = load_index(base_url)
+    migrated = 0
+    for legacy_key in legacy_keys:
+        response = requests.get(node_url(base_url, legacy_key), timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        record = response.json()
+        if not (isinstance(record, dict) and isinstance(record.get('data'), list)):
+            continue
+        digest = content_hash(record['data'])
+        if digest not in index:
+            key, index[key] = save_upload(base_url, record.get('filename', f"upload {legacy_key}"),
+                                          record.get('timestamp', ''), record['data'], digest)
+        requests.delete(node_url(base_url, legacy_key), timeout=REQUEST_TIMEOUT).raise_for_status()
+        migrated += 1
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintenance of the upload history database")
+    commands = parser.add_subparsers(dest='command', required=True)
+    migrate = commands.add_parser('migrate', help="move the uploads of the old single-list layout to the new one")
+    migrate.add_argument('url', help="root URL of the history database")
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        print(f"{migrate_legacy_history(args.url)} uploads migrated")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+
+# Reruns kept in memory for the debug panel and the JSON lines export
+MAX_RERUNS = 500
+
+# Optional exports for production: every rerun appended as one JSON line to
+# APP_TIMING_LOG, and the Prometheus metrics rewritten to APP_METRICS_FILE
+# after every rerun (for node_exporter's textfile collector)
+TIMING_LOG_PATH = os.environ.get('APP_TIMING_LOG')
+METRICS_PATH = os.environ.get('APP_METRICS_FILE')
+
+
+class Span:
+    def __init__(self, name, start, seconds, depth):
+        self.name = name
+        self.start = start
+        self.seconds = seconds
+        self.depth = depth
+
+    def to_dict(self):
+        return {'name': self.name, 'start': round(self.start, 6), 'seconds': round(self.seconds, 6),
+                'depth': self.depth}
+
+
+# Timings of one rerun of the script (or of one piece of background work):
+# its spans, with their start relative to the rerun's start and their nesting
+# depth, the total time and, when memory is traced, the peak of the memory
+# allocated by Python during the rerun.
+class Rerun:
+    def __init__(self, screen):
+        self.screen = screen
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans = []
+        self.depth = 0
+        self.seconds = None
+        self.peak_memory_bytes = None
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.start
+        self.spans.sort(key=lambda span: span.start)
+
+    def to_dict(self):
+        return {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+            'screen': self.screen,
+            'seconds': round(self.seconds, 6),
+            'peak_memory_bytes': self.peak_memory_bytes,
+            'spans': [span.to_dict() for span in self.spans],
+        }
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Process-wide record of the reruns: the last MAX_RERUNS in full, and running
+# totals of every (screen, span) pair for the Prometheus metrics
+class TimingLog:
+    def __init__(self, max_reruns=MAX_RERUNS, log_path=None, metrics_path=None):
+        self.reruns = deque(maxlen=max_reruns)
+        self.span_totals = {}
+        self.rerun_totals = {}
+        self.peak_memory = {}
+        self.log_path = log_path
+        self.metrics_path = metrics_path
+        self.lock = threading.Lock()
+
+    def add(self, rerun):
+        with self.lock:
+            self.reruns.append(rerun)
+            self._count(self.rerun_totals, rerun.screen, rerun.seconds)
+            for span in rerun.spans:
+                self._count(self.span_totals, (rerun.screen, span.name), span.seconds)
+            if rerun.peak_memory_bytes is not None:
+                self.peak_memory[rerun.screen] = max(self.peak_memory.get(rerun.screen, 0), rerun.peak_memory_bytes)
+            if self.log_path:
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(rerun.to_dict()) + '\n')
+            if self.metrics_path:
+                tmp_path = self.metrics_path + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(self._prometheus())
+                os.replace(tmp_path, self.metrics_path)
+
+    @staticmethod
+    def _count(totals, key, seconds):
+        count, total, longest = totals.get(key, (0, 0.0, 0.0))
+        totals[key] = (count + 1, total + seconds, max(longest, seconds))
+
+    # Count, total and longest time of every span, per screen
+    def summary(self):
+        with self.lock:
+            return [{'screen': screen, 'span': name, 'count': count, 'total_seconds': total,
+                     'max_seconds': longest}
+                    for (screen, name), (count, total, longest) in sorted(self.span_totals.items())]
+
+    def to_jsonl(self):
+        with self.lock:
+            return ''.join(json.dumps(rerun.to_dict()) + '\n' for rerun in self.reruns)
+
+    def to_prometheus(self):
+        with self.lock:
+            return self._prometheus()
+
+    def _prometheus(self):
+        lines = [
+            '# HELP app_rerun_seconds Time of the script reruns, per screen.',
+            '# TYPE app_rerun_seconds summary',
+        ]
+        for screen, (count, total, _) in sorted(self.rerun_totals.items()):
+            lines.append(f'app_rerun_seconds_sum{{screen="{_label(screen)}"}} {total:.6f}')
+            lines.append(f'app_rerun_seconds_count{{screen="{_label(screen)}"}} {count}')
+        lines += [
+            '# HELP app_span_seconds Time spent in each instrumented stage, per screen.',
+            '# TYPE app_span_seconds summary',
+        ]
+        for (screen, name), (count, total, _) in sorted(self.span_totals.items()):
+            labels = f'screen="{_label(screen)}",span="{_label(name)}"'
+            lines.append(f'app_span_seconds_sum{{{labels}}} {total:.6f}')
+            lines.append(f'app_span_seconds_count{{{labels}}} {count}')
+        lines += [
+            '# HELP app_span_max_seconds Longest time of each instrumented stage, per screen.',
+            '# TYPE app_span_max_seconds gauge',
+        ]
+        for (screen, name), (_, _, longest) in sorted(self.span_totals.items()):
+            lines.append(f'app_span_max_seconds{{screen="{_label(screen)}",span="{_label(name)}"}} {longest:.6f}')
+        if self.peak_memory:
+            lines += [
+                '# HELP app_rerun_peak_memory_bytes Largest Python memory peak of a rerun, per screen.',
+                '# TYPE app_rerun_peak_memory_bytes gauge',
+            ]
+            for screen, peak in sorted(self.peak_memory.items()):
+                lines.append(f'app_rerun_peak_memory_bytes{{screen="{_label(screen)}"}} {peak}')
+        return '\n'.join(lines) + '\n'
+
+
+timing_log = TimingLog(log_path=TIMING_LOG_PATH, metrics_path=METRICS_PATH)
+
+_current_rerun = contextvars.ContextVar('current_rerun', default=None)
+
+
+# Memory tracing for the peak memory of the reruns. It slows allocations down
+# for the whole process, so it is only on when the server is started with
+# APP_TRACE_MEMORY set.
+if os.environ.get('APP_TRACE_MEMORY') and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+# Times one rerun of a screen; the spans opened meanwhile in this thread are
+# recorded in it. With memory tracing on, the peak is reset at the start, so
+# it is the rerun's own peak unless another session ran at the same time.
+@contextmanager
+def rerun(screen, log=timing_log):
+    record = Rerun(screen)
+    token = _current_rerun.set(record)
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+    try:
+        yield record
+    finally:
+        record.finish()
+        if tracing and tracemalloc.is_tracing():
+            record.peak_memory_bytes = tracemalloc.get_traced_memory()[1]
+        _current_rerun.reset(token)
+        log.add(record)
+
+
+# Times the code of the with block as a stage of the current rerun. Outside a
+# rerun (e.g. in a background refresh thread) the span is logged on its own,
+# as a rerun of the "background" screen.
+@contextmanager
+def span(name, log=timing_log):
+    record = _current_rerun.get()
+    background = record is None
+    if background:
+        record = Rerun('background')
+    start = time.perf_counter()
+    depth = record.depth
+    record.depth += 1
+    try:
+        yield
+    finally:
+        record.depth = depth
+        record.spans.append(Span(name, start - record.start, time.perf_counter() - start, depth))
+        if background:
+            record.finish()
+            log.add(record)
@@ -0,0 +1,51 @@
+import random
+import re
+
+
+TOKEN = re.compile(r"[a-z0-9']+")
+
+
+def tokenize(text):
+    return TOKEN.findall(text.lower())
+
+
+# All intent phrases compiled into one token trie. A question matches an
+# intent when its words start with one of the intent's phrases (so "hi there"
+# is a greeting but "history" is not). Matching walks the trie once along the
+# question's words, so its cost depends on the question length, not on how
+# many intents there are. When several phrases match, the intent added first
+# wins, whatever the phrase lengths.
+class IntentMatcher:
+    def __init__(self):
+        self.root = ({}, [])
+        self.intents = []
+
+    # Intents are prioritized in the order they are added
+    def add(self, name, phrases, responses):
+        priority = len(self.intents)
+        self.intents.append((name, list(responses)))
+        for phrase in phrases:
+            node = self.root
+            for token in tokenize(phrase):
+                node = node[0].setdefault(token, ({}, []))
+            node[1].append(priority)
+        return self
+
+    def match(self, text):
+        best = None
+        node = self.root
+        for token in tokenize(text):
+            node = node[0].get(token)
+            if node is None:
+                break
+            if node[1]:
+                priority = min(node[1])
+                if best is None or priority < best:
+                    best = priority
+        return None if best is None else self.intents[best]
+
+    def respond(self, text):
+        intent = self.match(text)
+        if intent is None:
+            return None
+        return random.choice(intent[1])
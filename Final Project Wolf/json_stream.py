@@ -0,0 +1,112 @@
+import codecs
+import json
+
+
+# Bytes read from the file at a time
+CHUNK_BYTES = 1 << 20
+
+WHITESPACE = ' \t\n\r'
+NUMBER_CHARS = '0123456789.eE+-'
+
+_decoder = json.JSONDecoder()
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# Text of a binary (or text) file read one chunk at a time. Holds the text not
+# consumed yet; consume() drops what the parser is done with.
+class _TextChunks:
+    def __init__(self, file, chunk_bytes, progress):
+        self.file = file
+        self.chunk_bytes = chunk_bytes
+        self.progress = progress
+        self.decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self.text = ''
+        self.pos = 0
+        self.bytes_read = 0
+        self.eof = False
+
+    def fill(self):
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_bytes)
+        text = chunk if isinstance(chunk, str) else self.decoder.decode(chunk, final=not chunk)
+        self.bytes_read += len(chunk)
+        if not chunk:
+            self.eof = True
+        if self.pos > self.chunk_bytes:
+            self.text = self.text[self.pos:]
+            self.pos = 0
+        self.text += text
+        if self.progress is not None:
+            self.progress(self.bytes_read)
+        return True
+
+    # Next non-whitespace character, without consuming it ('' at the end)
+    def peek(self):
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}', found {found or 'end of file'!r}")
+        self.pos += 1
+
+    # One complete JSON value, reading more chunks until it is whole
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+                # A number followed by nothing but number characters ("1." or
+                # "1e" of 1.5 or 1e3) may continue in the next chunk
+                if self.eof or not _is_number(value) or self.text[end:].strip(NUMBER_CHARS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+
+# Records of a JSON array read incrementally from a file, one at a time. Only
+# the current chunk of text and the record being decoded are in memory, never
+# the whole list, so a caller that folds the records into something compact
+# (a columnar table, a hash) needs memory for that result only. A JSON object
+# yields its values, which is how Firebase returns arrays with gaps, and null
+# yields nothing. progress(bytes_read) is called after every chunk read.
+def iter_json_records(file, progress=None, chunk_bytes=CHUNK_BYTES):
+    text = _TextChunks(file, chunk_bytes, progress)
+    first = text.peek()
+    if first == 'n':
+        if text.value() is not None:
+            raise ValueError("Expected a JSON array of records")
+    elif first in ('[', '{'):
+        closing = ']' if first == '[' else '}'
+        text.pos += 1
+        if text.peek() == closing:
+            text.pos += 1
+        else:
+            while True:
+                if closing == '}':
+                    if not isinstance(text.value(), str):
+                        raise ValueError("Expected an object key")
+                    text.expect(':')
+                yield text.value()
+                if text.peek() == closing:
+                    text.pos += 1
+                    break
+                text.expect(',')
+    else:
+        raise ValueError("Expected a JSON array of records")
+
+    if text.peek():
+        raise ValueError("Extra data after the records")
@@ -0,0 +1,207 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import numpy as np
+import requests
+
+import history_store
+from activity_generator import Vocabulary, generate_records
+from fake_firebase import FakeFirebaseServer
+
+
+# Many simulated sessions driving a real Streamlit server at the same time,
+# against the local Firebase stand-in seeded with generated logs. Each session
+# runs the Admin flow (load an upload), the filter flow (Parameter Selection
+# with a user filter and a date range) and the statistics flow, and the script
+# reports the throughput and the latency percentiles of each flow:
+#
+#   python load_test.py --sessions 30 --concurrency 10 --rows 100000
+#
+# The server is started here (streamlit run app.py, with FIREBASE_URL and
+# FIREBASE_HISTORY_URL pointing at the stand-in). Sessions talk to it over
+# Streamlit's websocket protocol like browsers do: every interaction sends the
+# widget values and waits until the rerun of the script has finished. --app-url
+# drives an already running server instead.
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+FLOWS = ['admin', 'filter', 'statistics']
+PERCENTILES = [50, 95, 99]
+
+
+# One browser session of the app over its websocket: the elements of the last
+# rerun, and the widget values it sends with every rerun
+class Session:
+    def __init__(self, socket, timeout):
+        self.socket = socket
+        self.timeout = timeout
+        self.widget_states = {}
+        self.elements = []
+        self.errors = []
+
+    def rerun(self):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        message = BackMsg()
+        message.rerun_script.query_string = ''
+        message.rerun_script.widget_states.widgets.extend(self.widget_states.values())
+        self.socket.send(message.SerializeToString())
+
+        self.elements = []
+        while True:
+            reply = ForwardMsg()
+            reply.ParseFromString(self.socket.recv(timeout=self.timeout))
+            kind = reply.WhichOneof('type')
+            if kind == 'delta' and reply.delta.WhichOneof('type') == 'new_element':
+                element = reply.delta.new_element
+                element_type = element.WhichOneof('type')
+                self.elements.append((element_type, getattr(element, element_type)))
+                if element_type == 'exception':
+                    self.errors.append(element.exception.message)
+            elif kind == 'script_finished':
+                return
+
+    def widget(self, element_type, label):
+        for found_type, proto in self.elements:
+            if found_type == element_type and proto.label == label:
+                return proto
+        raise LookupError(f"No {element_type} '{label}' on the page")
+
+    # Set a widget of the last rerun (found by type and label) for the next reruns
+    def set(self, element_type, label, value):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        state = WidgetState(id=self.widget(element_type, label).id)
+        if element_type == 'multiselect':
+            state.string_array_value.data[:] = value
+        elif element_type == 'date_input':
+            state.string_array_value.data[:] = [value.isoformat()]
+        else:
+            state.string_value = value
+        self.widget_states[state.id] = state
+        self.rerun()
+
+
+def seed_database(server, uploads, rows):
+    vocabulary = Vocabulary()
+    for number in range(uploads):
+        records = generate_records(rows, seed=number, vocabulary=vocabulary)
+        history_store.save_upload(server.url, f"generated {number + 1}.json", f"2024-01-01 00:00:{number:02d}",
+                                  records)
+    server.put('activities', generate_records(min(rows, 10000), seed=uploads, vocabulary=vocabulary))
+
+
+def start_app(port, database_url, timeout):
+    env = dict(os.environ, FIREBASE_URL=f"{database_url}/activities.json", FIREBASE_HISTORY_URL=database_url,
+               FIREBASE_SNAPSHOT_PATH=os.path.join(tempfile.mkdtemp(prefix='load_test_'), 'snapshot.json'))
+    process = subprocess.Popen([sys.executable, '-m', 'streamlit', 'run', APP_PATH, '--server.headless', 'true',
+                                '--server.port', str(port), '--browser.gatherUsageStats', 'false'],
+                               env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    app_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{app_url}/_stcore/health", timeout=1).ok:
+                return process, app_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("The Streamlit server did not start")
+
+
+# One session: the three flows in order, each timed. Sessions pick different
+# uploads and user filters, so they do not all hit the same cached results.
+def run_session(app_url, number, timeout):
+    from websockets.sync.client import connect
+
+    latencies = {}
+    stream_url = app_url.replace('http', 'ws', 1).rstrip('/') + '/_stcore/stream'
+    with connect(stream_url, subprotocols=['streamlit'], max_size=None, open_timeout=timeout) as socket:
+        session = Session(socket, timeout)
+        start = time.perf_counter()
+        session.rerun()
+        options = session.widget('multiselect', "Choose JSON files").options
+        session.set('multiselect', "Choose JSON files", [options[number % len(options)]])
+        latencies['admin'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        session.set('radio', "Go to", "Parameter Selection")
+        session.set('date_input', "Start Date", date(2022, 1, 1))
+        session.set('multiselect', "Select parameters", ['User'])
+        session.set('text_input', "Filter by User", f"student{'abcdefgh'[number % 8]}")
+        latencies['filter'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        session.set('radio', "Go to", "Interesting Statistics")
+        latencies['statistics'] = time.perf_counter() - start
+    return latencies, session.errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the app with concurrent simulated sessions")
+    parser.add_argument('--sessions', type=int, default=30)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--uploads', type=int, default=3, help="generated uploads to seed the database with")
+    parser.add_argument('--rows', type=int, default=100000, help="rows of each generated upload")
+    parser.add_argument('--port', type=int, default=8599, help="port of the Streamlit server started here")
+    parser.add_argument('--timeout', type=float, default=300, help="seconds one rerun may take")
+    parser.add_argument('--app-url', help="drive this running app instead of starting one")
+    args = parser.parse_args()
+
+    server = process = None
+    app_url = args.app_url
+    if app_url is None:
+        server = FakeFirebaseServer().start()
+        print(f"Seeding {server.url} with {args.uploads} uploads of {args.rows} rows...")
+        seed_database(server, args.uploads, args.rows)
+        process, app_url = start_app(args.port, server.url, args.timeout)
+
+    latencies = {flow: [] for flow in FLOWS}
+    errors = []
+    lock = threading.Lock()
+
+    def session(number):
+        try:
+            result, session_errors = run_session(app_url, number, args.timeout)
+        except Exception as e:
+            result, session_errors = {}, [f"{type(e).__name__}: {e}"]
+        with lock:
+            for flow, seconds in result.items():
+                latencies[flow].append(seconds)
+            errors.extend(session_errors)
+
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(session, range(args.sessions)))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if server is not None:
+            server.stop()
+    elapsed = time.perf_counter() - start
+
+    print(f"\n{args.sessions} sessions, {args.concurrency} at a time: {elapsed:.1f} s, "
+          f"{args.sessions / elapsed * 60:.1f} sessions/min")
+    print(f"{'flow':12s} {'count':>6s} " + ' '.join(f"{'p' + str(p):>9s}" for p in PERCENTILES) + f" {'max':>9s}")
+    for flow in FLOWS:
+        values = np.array(latencies[flow])
+        if not len(values):
+            continue
+        row = [np.percentile(values, p) for p in PERCENTILES] + [values.max()]
+        print(f"{flow:12s} {len(values):6d} " + ' '.join(f"{value:8.2f}s" for value in row))
+    if errors:
+        print(f"\n{len(errors)} errors, e.g. {errors[0]}")
+
+
+if __name__ == "__main__":
+    main()
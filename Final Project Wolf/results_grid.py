@@ -0,0 +1,80 @@
+import numpy as np
+
+from filter_engine import FilterIndex
+
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+# Server side of the Parameters Results grid, over the rows of a table with
+# the given ids (the filtered results; all rows without ids). Sorting and
+# searching run here on the columnar table and only produce positions in
+# those rows; the screen then turns the one visible page into a DataFrame, so
+# neither the results nor more than page_size rows are ever copied out.
+#
+# - Each sort order is one stable argsort of a column of the results, computed
+#   on first use and kept for the life of the grid (missing values last in
+#   both directions).
+# - Column searches are case-insensitive substring matches through the
+#   FilterIndex of the table (pass the dataset's own to share it), so
+#   categorical columns are searched through their distinct values. Unlike
+#   the filters, rows with a missing value do not match a search.
+# - The rows of the last query are kept, so changing page does not search or
+#   sort again.
+class ResultsGrid:
+    def __init__(self, table, row_ids=None, index=None):
+        self.table = table
+        self.row_ids = np.arange(len(table)) if row_ids is None else row_ids
+        self.index = FilterIndex(table) if index is None else index
+        self.orders = {}
+        self.last_query = None
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    # Memory of the row ids and sort orders, not counting the table and its index
+    def memory_bytes(self):
+        return self.row_ids.nbytes + sum(order.nbytes for order in self.orders.values())
+
+    def sort_order(self, column, ascending=True):
+        key = (column, ascending)
+        if key not in self.orders:
+            values = self.table[column].iloc[self.row_ids].reset_index(drop=True)
+            try:
+                ordered = values.sort_values(ascending=ascending, kind='stable', na_position='last')
+            except TypeError:
+                # Columns mixing types (e.g. numbers and text) sort by their text form
+                ordered = values.astype(str).where(values.notna()).sort_values(
+                    ascending=ascending, kind='stable', na_position='last')
+            self.orders[key] = ordered.index.to_numpy()
+        return self.orders[key]
+
+    # Positions of the rows matching every column search, in sort order
+    def rows(self, searches=None, sort_column=None, ascending=True):
+        searches = {column: text for column, text in (searches or {}).items()
+                    if text and column in self.table.columns}
+        query = (sorted(searches.items()), sort_column, ascending)
+        if self.last_query is not None and self.last_query[0] == query:
+            return self.last_query[1]
+
+        if sort_column in self.table.columns:
+            rows = self.sort_order(sort_column, ascending)
+        else:
+            rows = np.arange(len(self.row_ids))
+        if searches:
+            mask = np.ones(len(self.table), dtype=bool)
+            for column, text in searches.items():
+                mask &= self.index.substring_mask(column, text, keep_missing=False)
+            rows = rows[mask[self.row_ids[rows]]]
+
+        self.last_query = (query, rows)
+        return rows
+
+    # The rows of one page (numbered from 0) as a DataFrame
+    def page(self, rows, page, page_size):
+        start = page * page_size
+        return self.table.iloc[self.row_ids[rows[start:start + page_size]]].reset_index(drop=True)
+
+
+def page_count(n_rows, page_size):
+    return max(1, -(-n_rows // page_size))
@@ -0,0 +1,79 @@
+import pandas as pd
+
+from aggregation import map_reduce
+
+
+# Dimensions of the statistics cube. Every Interesting Statistics chart is a
+# sum of the 'Actions' counts over some of them.
+CUBE_DIMENSIONS = ['Date', 'Hour', 'DayOfWeek', 'User', 'ActivityType', 'Tab', 'Document']
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+# Count of actions per (date, hour, weekday, user, activity type, tab, document),
+# built once per dataset and filter combination. Rows without a valid Time are
+# left out, as the charts always did. Large tables are counted in chunks in the
+# aggregation process pool and the partial cubes merged. rows (row ids) counts
+# a filtered selection of the table without keeping a copy of it.
+def build_stats_cube(table, workers=None, rows=None):
+    return map_reduce(table, count_cube, merge_cubes, workers, rows=rows)
+
+
+# Cube of one run of rows
+def count_cube(table):
+    table = table[table['Time'].notna()]
+    times = table['Time']
+    keys = {
+        'Date': times.dt.normalize(),
+        'Hour': times.dt.hour,
+        'DayOfWeek': times.dt.dayofweek,
+    }
+    for column in ['User', 'ActivityType', 'Tab', 'Document']:
+        keys[column] = table[column]
+    cube = (pd.DataFrame(keys)
+            .groupby(CUBE_DIMENSIONS, observed=True, dropna=False, sort=False)
+            .size()
+            .rename('Actions')
+            .reset_index())
+    cube['Date'] = cube['Date'].dt.date
+    cube['DayOfWeek'] = pd.Categorical.from_codes(cube['DayOfWeek'], categories=DAY_NAMES)
+    return cube
+
+
+# Sum partial cubes cell by cell
+def merge_cubes(cubes):
+    return (pd.concat(cubes, ignore_index=True)
+            .groupby(CUBE_DIMENSIONS, observed=True, dropna=False, sort=False)['Actions']
+            .sum()
+            .reset_index())
+
+
+def cube_counts(cube, dimensions):
+    return cube.groupby(dimensions, observed=True)['Actions'].sum()
+
+
+def top_counts(cube, dimension, n=10):
+    return cube_counts(cube, dimension).sort_values(ascending=False, kind='stable').head(n)
+
+
+def activity_category_counts(cube):
+    return cube_counts(cube, 'ActivityType').sort_values(ascending=False, kind='stable')
+
+
+def actions_per_day(cube):
+    return cube_counts(cube, 'Date')
+
+
+def activity_types_per_day(cube):
+    return cube_counts(cube, ['Date', 'ActivityType']).unstack(fill_value=0)
+
+
+# Day of week x hour of day matrix; days in name order, as pivot_table gave them
+def weekday_hour_counts(cube):
+    counts = cube_counts(cube, ['DayOfWeek', 'Hour']).unstack(fill_value=0)
+    counts.index = counts.index.astype(str)
+    return counts.sort_index()
+
+
+def activities_per_user(cube):
+    return cube_counts(cube, ['User', 'ActivityType']).unstack(fill_value=0)
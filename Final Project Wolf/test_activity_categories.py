@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from activity_categories import ACTIVITY_KEYWORDS, ACTIVITY_TYPES, categorize_activity, categorize_column
+from activity_generator import generate_records
+
+
+# The three any() checks the compiled pattern replaced
+def categorize_by_keyword_lists(description):
+    for name, keywords in ACTIVITY_KEYWORDS:
+        if any(keyword in description.lower() for keyword in keywords):
+            return name
+    return 'Other'
+
+
+DESCRIPTIONS = [
+    'Add or modify a sketch',
+    'Open document',
+    'Close document',
+    'Comment on a Document',
+    'Export to STEP',
+    'Copy part studio',
+    'Import file, then open it',
+    'View assembly and delete mate',
+    'Reopen the tab',
+    'TRANSFER ownership',
+    'Assign Material',
+    'Stop assembly drag',
+    'Reviewed',
+    '',
+]
+
+
+@pytest.mark.parametrize('description', DESCRIPTIONS)
+def test_categorize_activity_matches_the_keyword_lists(description):
+    assert categorize_activity(description) == categorize_by_keyword_lists(description)
+
+
+def test_categorize_activity_matches_the_keyword_lists_on_generated_descriptions():
+    descriptions = {record['Description'] for record in generate_records(5000, seed=8)}
+    assert {description: categorize_activity(description) for description in descriptions} == \
+        {description: categorize_by_keyword_lists(description) for description in descriptions}
+
+
+def test_categorize_column_keeps_the_index_and_makes_missing_descriptions_other():
+    descriptions = pd.Series(['Open document', None, 'Insert part', 'Open document'], index=[3, 5, 8, 9])
+    types = categorize_column(descriptions)
+
+    assert list(types.cat.categories) == ACTIVITY_TYPES
+    assert types.to_dict() == {3: 'Viewing', 5: 'Other', 8: 'Creative', 9: 'Viewing'}
@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+from activity_generator import generate_records
+from activity_schema import ValidationReport
+from activity_table import build_activity_table, build_activity_table_chunked
+
+
+@pytest.fixture(scope='module')
+def records():
+    records = generate_records(1000, seed=2)
+    records[5] = 'not a record'
+    records[17]['Time'] = 'yesterday'
+    del records[40]['Document']
+    records[41]['Tab'] = None
+    records[60]['Extra'] = 3
+    return records
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 7, 100, 1000, 5000])
+def test_chunked_build_matches_build_activity_table(records, chunk_rows):
+    report = ValidationReport()
+    chunked_report = ValidationReport()
+    expected = build_activity_table(records, report)
+    table = build_activity_table_chunked(iter(records), chunked_report, chunk_rows=chunk_rows)
+
+    pd.testing.assert_frame_equal(table, expected, check_categorical=False)
+    for column in ['User', 'Document', 'Tab', 'Description', 'ActivityType']:
+        assert isinstance(table[column].dtype, pd.CategoricalDtype)
+    assert vars(chunked_report) == vars(report)
+
+
+def test_chunked_build_of_no_records():
+    table = build_activity_table_chunked(iter([]))
+
+    assert len(table) == 0
+    assert list(table.columns) == list(build_activity_table([]).columns)
@@ -0,0 +1,67 @@
+from budget_cache import BudgetLRUCache
+
+
+def parent(key):
+    return key[:-1] or None
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = BudgetLRUCache(10)
+    cache.put('a', 'xxxx')
+    cache.put('b', 'xxxx')
+    cache.get('a')
+    cache.put('c', 'xxxx')
+
+    assert sorted(cache.entries) == ['a', 'c']
+    assert cache.stats()['evictions'] == 1
+
+
+def test_oversized_values_are_not_stored_by_default():
+    cache = BudgetLRUCache(4)
+    cache.put('a', 'xx')
+
+    assert cache.put('b', 'x' * 10) == 'x' * 10
+    assert list(cache.entries) == ['a']
+
+
+def test_keep_oversized_keeps_the_value_alone():
+    cache = BudgetLRUCache(4, keep_oversized=True)
+    cache.put('a', 'xx')
+    cache.put('b', 'x' * 10)
+
+    assert list(cache.entries) == ['b']
+    assert cache.get('b') == 'x' * 10
+
+
+def test_entries_built_from_an_evicted_entry_go_with_it():
+    cache = BudgetLRUCache(10, parent=parent)
+    cache.put(('a',), 'xxx')
+    cache.put(('a', 'index'), 'xx')
+    cache.put(('a', 'index', 'grid'), 'x')
+    cache.put(('b',), 'xxx')
+    cache.get(('a', 'index', 'grid'))
+    cache.put(('c',), 'xxxx')
+
+    assert sorted(cache.entries) == [('b',), ('c',)]
+    assert cache.total_bytes == 7
+
+
+def test_an_oversized_value_keeps_the_entries_it_was_built_from():
+    cache = BudgetLRUCache(10, parent=parent, keep_oversized=True)
+    cache.put(('a',), 'x' * 8)
+    cache.put(('b',), 'x')
+    cache.put(('a', 'index'), 'xxx')
+
+    assert sorted(cache.entries) == [('a',), ('a', 'index')]
+
+
+def test_resize_measures_a_grown_value_again():
+    cache = BudgetLRUCache(10)
+    value = ['x']
+    cache.put('a', ['y'])
+    cache.put('b', value)
+    value.extend('x' * 9)
+    cache.resize('b')
+
+    assert list(cache.entries) == ['b']
+    assert cache.total_bytes == 10
@@ -0,0 +1,93 @@
+from datetime import date
+
+import pytest
+
+from activity_generator import generate_records
+from activity_table import build_activity_table
+from chat_queries import CountIndex, CountQueries, EVENTS
+
+QUERIES = [
+    {},
+    {'user': 'StudentA'},
+    {'user': 'StudentB', 'activity': 'Creative'},
+    {'document': '1st lab', 'start_date': date(2022, 11, 1), 'end_date': date(2022, 11, 30)},
+    {'user': 'StudentC', 'tab': 'Assembly 1', 'start_date': date(2022, 12, 1)},
+    {'activity': 'Viewing', 'end_date': date(2022, 12, 31)},
+    {'user': 'Nobody'},
+    {'event': 'Comment'},
+    {'user': 'StudentA', 'event': 'Open', 'start_date': date(2022, 12, 1)},
+]
+
+
+@pytest.fixture(scope='module')
+def table():
+    records = generate_records(5000, seed=4)
+    for i in range(0, len(records), 13):
+        del records[i]['Tab']
+    return build_activity_table(records)
+
+
+def expected_rows(table, user=None, document=None, tab=None, activity=None, event=None, start_date=None, end_date=None):
+    rows = table
+    for column, value in [('User', user), ('Document', document), ('Tab', tab), ('ActivityType', activity),
+                          ('Description', EVENTS.get(event))]:
+        if value is not None:
+            rows = rows[rows[column] == value]
+    days = rows['Time'].dt.date
+    if start_date is not None:
+        rows = rows[days >= start_date]
+        days = days[days >= start_date]
+    if end_date is not None:
+        rows = rows[days <= end_date]
+    return rows
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_count_matches_the_table(table, query):
+    assert CountIndex(table, workers=1).count(**query) == len(expected_rows(table, **query))
+
+
+def test_rows_without_a_tab_are_counted_only_without_one():
+    index = CountIndex(build_activity_table([
+        {'Time': '2022-11-06 15:44:10', 'User': 'A', 'Description': 'Insert part'},
+        {'Time': '2022-11-07 15:44:10', 'User': 'A', 'Tab': 'Assembly 1', 'Description': 'Insert part'},
+    ]), workers=1)
+
+    assert index.count(user='A') == 2
+    assert index.count(user='A', tab='Assembly 1') == 1
+    assert index.count(user='A', start_date=date(2022, 11, 7), end_date=date(2022, 11, 7)) == 1
+
+
+@pytest.mark.parametrize('slot', ['User', 'Tab', 'Document'])
+@pytest.mark.parametrize('query', QUERIES)
+def test_distinct_matches_the_table(table, slot, query):
+    expected = expected_rows(table, **query)[slot].nunique()
+    assert CountIndex(table, workers=1).distinct(slot, **query) == expected
+
+
+@pytest.fixture(scope='module')
+def queries(table):
+    return CountQueries(table, today=date(2022, 12, 15))
+
+
+def test_comments_are_counted_as_comments(table, queries):
+    expected = len(expected_rows(table, user='StudentA', event='Comment'))
+    assert queries.respond("How many comments were made by StudentA?") == f"StudentA made {expected} comments."
+
+
+def test_document_openings_are_counted_as_openings(table, queries):
+    expected = len(expected_rows(table, event='Open', start_date=date(2022, 11, 1), end_date=date(2022, 12, 15)))
+    assert queries.parse("How many times was the document opened since 2022-11-01?")['event'] == 'Open'
+    assert queries.respond("How many times was the document opened since 2022-11-01?").startswith(
+        f"The document was opened {expected} times")
+
+
+def test_users_are_counted_as_unique_users(table, queries):
+    expected = expected_rows(table, start_date=date(2022, 11, 1), end_date=date(2022, 11, 30))['User'].nunique()
+    assert queries.respond("How many users interacted with the document last month").startswith(
+        f"{expected} unique users were active")
+
+
+def test_questions_about_other_measures_are_left_to_the_fixed_answers(queries):
+    assert queries.parse("How many sketches did StudentA make?") is None
+    assert queries.parse("How many comments were made?") is None
@@ -0,0 +1,56 @@
+from datetime import date
+
+import pytest
+
+from activity_generator import generate_records
+from activity_table import build_activity_table
+from filter_engine import FilterIndex, filter_json_data, row_ids
+
+CASES = [
+    ({}, None, None),
+    ({}, date(2022, 11, 1), date(2022, 12, 31)),
+    ({}, date(2022, 11, 1), None),
+    ({'User': 'studenta'}, None, None),
+    ({'User': 'STUDENT', 'Tab': 'assembly'}, date(2022, 11, 1), date(2023, 3, 1)),
+    ({'Description': 'sketch'}, date(2000, 1, 1), date(2100, 1, 1)),
+    ({'Document': 'la'}, None, None),
+    ({'Time': '2022-11-17'}, None, None),
+    ({'User': 'nobody'}, None, None),
+]
+
+
+@pytest.fixture(scope='module')
+def records():
+    records = generate_records(3000, seed=1)
+    # Records without some of the filtered fields pass those filters
+    for i in range(0, len(records), 7):
+        del records[i]['User']
+    for i in range(3, len(records), 11):
+        del records[i]['Tab']
+    return records
+
+
+@pytest.fixture(scope='module')
+def index(records):
+    return FilterIndex(build_activity_table(records))
+
+
+@pytest.mark.parametrize('filters, start_date, end_date', CASES)
+def test_mask_selects_the_rows_of_filter_json_data(records, index, filters, start_date, end_date):
+    positions = {id(item): i for i, item in enumerate(records)}
+    expected = [positions[id(item)] for item in filter_json_data(records, filters, start_date, end_date)]
+
+    assert row_ids(index.mask(filters, start_date, end_date)).tolist() == expected
+
+
+# The table does not tell a null from a missing field (see FilterIndex)
+def test_null_passes_like_a_missing_field():
+    records = [
+        {'Time': '2022-11-06 15:44:10', 'User': 'A'},
+        {'Time': '2022-11-06 15:44:10', 'User': None},
+        {'Time': '2022-11-06 15:44:10', 'User': 'none'},
+    ]
+    index = FilterIndex(build_activity_table(records))
+
+    assert row_ids(index.mask({'User': 'a'})).tolist() == [0, 1]
+    assert row_ids(index.mask({'User': 'none'})).tolist() == [1, 2]
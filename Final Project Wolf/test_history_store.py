@@ -0,0 +1,99 @@
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import requests
+
+import history_store
+from fake_firebase import FakeFirebaseServer
+
+RECORDS = [
+    {'Time': '2022-11-06 15:44:10', 'Document': '1st lab', 'Tab': 'Part Studio 1', 'User': 'StudentA',
+     'Description': 'Add or modify a sketch'},
+    {'Time': '2022-11-06 15:45:02', 'Document': '1st lab', 'Tab': 'Assembly 1', 'User': 'StudentB',
+     'Description': 'Insert part'},
+    {'Time': '2022-11-06 15:46:30', 'Document': '1st lab', 'User': 'StudentA',
+     'Description': 'Stop assembly drag', 'Extra': 1.5},
+]
+
+
+@pytest.fixture
+def server():
+    with FakeFirebaseServer() as server:
+        yield server
+
+
+# Server that announces a whole payload but closes the connection halfway
+@pytest.fixture
+def truncated_server():
+    body = json.dumps(RECORDS).encode('utf-8')
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body[:len(body) // 2])
+
+        def log_message(self, format, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def uploaded_file(records, bom=False):
+    data = json.dumps(records, indent=1).encode('utf-8')
+    return io.BytesIO((b'\xef\xbb\xbf' if bom else b'') + data)
+
+
+@pytest.mark.parametrize('bom', [False, True])
+def test_save_upload_file_round_trip(server, bom):
+    file = uploaded_file(RECORDS, bom)
+    digest = history_store.content_hash(RECORDS)
+    key, entry = history_store.save_upload_file(server.url, 'lab.json', '2024-08-01 10:00:00', file, digest,
+                                                len(RECORDS))
+
+    assert key == digest
+    assert history_store.load_index(server.url) == {key: entry}
+    assert entry == {'filename': 'lab.json', 'timestamp': '2024-08-01 10:00:00', 'hash': digest, 'rows': 3}
+    assert list(history_store.iter_payload(server.url, key)) == RECORDS
+
+
+def test_same_content_is_stored_once(server):
+    first, _ = history_store.save_upload(server.url, 'a.json', '2024-08-01 10:00:00', RECORDS)
+    file = uploaded_file(RECORDS)
+    second, _ = history_store.save_upload_file(server.url, 'b.json', '2024-08-02 10:00:00', file, first,
+                                               len(RECORDS))
+
+    assert first == second
+    assert list(history_store.load_index(server.url)) == [first]
+
+
+def test_truncated_payload_raises_a_requests_error(truncated_server):
+    with pytest.raises(requests.RequestException):
+        list(history_store.iter_payload(truncated_server, 'key'))
+
+
+def test_load_index_of_an_empty_database(server):
+    assert history_store.load_index(server.url) == {}
+
+
+def test_migrate_legacy_history_keeps_entries_it_did_not_copy(server):
+    server.put('0', {'filename': 'old.json', 'timestamp': '2023-01-01 00:00:00', 'data': RECORDS})
+    server.put('1', {'note': 'not an upload'})
+
+    assert history_store.migrate_legacy_history(server.url) == 1
+
+    index = history_store.load_index(server.url)
+    key = history_store.content_hash(RECORDS)
+    assert index[key]['filename'] == 'old.json'
+    assert list(history_store.iter_payload(server.url, key)) == RECORDS
+    assert server.get('0') is None
+    assert server.get('1') == {'note': 'not an upload'}
@@ -0,0 +1,56 @@
+import pytest
+
+from activity_generator import generate_records
+from activity_table import build_activity_table
+from chat_engine import QUESTIONS, build_intents, summarize_activity_table
+from intent_matcher import IntentMatcher
+
+
+def intent_name(matcher, text):
+    intent = matcher.match(text)
+    return None if intent is None else intent[0]
+
+
+def test_the_intent_added_first_wins():
+    short_first = IntentMatcher().add('short', ['how many'], ['a']).add('long', ['how many comments'], ['b'])
+    long_first = IntentMatcher().add('long', ['how many comments'], ['b']).add('short', ['how many'], ['a'])
+
+    assert intent_name(short_first, 'How many comments were made?') == 'short'
+    assert intent_name(long_first, 'How many comments were made?') == 'long'
+    assert intent_name(long_first, 'How many tabs?') == 'short'
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('hi', 'greeting'),
+    ('Hi there!', 'greeting'),
+    ('HELLO, anyone?', 'greeting'),
+    ('history', None),
+    ('say hi', None),
+    ('hey you', 'greeting'),
+    ('how are you', 'how_are_you'),
+    ('how are', None),
+    ('bye', 'goodbye'),
+    ('byebye', None),
+    ('', None),
+])
+def test_phrases_match_whole_words_at_the_start(text, expected):
+    matcher = (IntentMatcher()
+               .add('greeting', ['hi', 'hello', 'hey'], ['Hello!'])
+               .add('how_are_you', ['how are you'], ['Fine.'])
+               .add('goodbye', ['exit', 'bye', 'goodbye'], ['Goodbye!']))
+    assert intent_name(matcher, text) == expected
+
+
+def test_respond_picks_one_of_the_intent_responses():
+    matcher = IntentMatcher().add('greeting', ['hi'], ['Hello!', 'Hi there!'])
+
+    assert matcher.respond('hi') in ('Hello!', 'Hi there!')
+    assert matcher.respond('what?') is None
+
+
+def test_every_predefined_question_gets_its_own_intent():
+    intents = build_intents(summarize_activity_table(build_activity_table(generate_records(500, seed=3))))
+    matched = [intent_name(intents, question) for question in QUESTIONS]
+
+    assert None not in matched
+    assert len(set(matched)) == len(QUESTIONS)
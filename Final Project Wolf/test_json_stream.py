@@ -0,0 +1,76 @@
+import io
+import json
+
+import pytest
+
+from json_stream import CHUNK_BYTES, iter_json_records
+
+RECORDS = [
+    {'Time': '2022-11-06 15:44:10', 'User': 'StudentA', 'Description': 'Add or modify a sketch'},
+    {'Time': '2022-11-06 15:45:02', 'User': 'StudentB', 'Description': 'Insert part', 'Extra': [1, None, True]},
+]
+
+CHUNK_SIZES = [1, 2, 7, CHUNK_BYTES]
+
+
+def records_of(text, chunk_bytes, progress=None):
+    return list(iter_json_records(io.BytesIO(text.encode('utf-8')), progress, chunk_bytes))
+
+
+@pytest.mark.parametrize('chunk_bytes', CHUNK_SIZES)
+@pytest.mark.parametrize('text, expected', [
+    (json.dumps(RECORDS), RECORDS),
+    (json.dumps(RECORDS, indent=2), RECORDS),
+    ('[]', []),
+    (' [ ] ', []),
+    # Firebase returns an array with gaps as an object keyed by index
+    ('{"0": {"a": 1}, "3": {"b": 2}}', [{'a': 1}, {'b': 2}]),
+    ('{}', []),
+    ('null', []),
+])
+def test_records_do_not_depend_on_the_chunk_size(text, expected, chunk_bytes):
+    assert records_of(text, chunk_bytes) == expected
+
+
+@pytest.mark.parametrize('chunk_bytes', CHUNK_SIZES)
+def test_numbers_split_across_chunks(chunk_bytes):
+    text = '[1.5, -2e10, 3.25E-3, 10, 0.125, 7, 1e+2]'
+    assert records_of(text, chunk_bytes) == json.loads(text)
+
+
+@pytest.mark.parametrize('chunk_bytes', CHUNK_SIZES)
+def test_bom_and_multi_byte_characters(chunk_bytes):
+    records = [{'User': 'סטודנט', 'Document': 'café 🐺'}]
+    data = b'\xef\xbb\xbf' + json.dumps(records, ensure_ascii=False).encode('utf-8')
+    assert list(iter_json_records(io.BytesIO(data), chunk_bytes=chunk_bytes)) == records
+
+
+def test_text_files_are_read_too():
+    assert list(iter_json_records(io.StringIO(json.dumps(RECORDS)), chunk_bytes=3)) == RECORDS
+
+
+def test_progress_reports_the_bytes_read():
+    text = json.dumps(RECORDS)
+    reported = []
+    records_of(text, 16, reported.append)
+    assert reported == sorted(reported)
+    assert reported[-1] == len(text.encode('utf-8'))
+
+
+@pytest.mark.parametrize('chunk_bytes', CHUNK_SIZES)
+@pytest.mark.parametrize('text', [
+    '[{"a": 1}] [2]',
+    '[{"a": 1}] x',
+    'null null',
+    '[{"a": 1}',
+    '[{"a": 1}, {"b"',
+    '[{"a": 1} {"b": 2}]',
+    '{"0" {"a": 1}}',
+    '{1: {"a": 1}}',
+    '"records"',
+    '42',
+    '',
+])
+def test_malformed_input_is_rejected(text, chunk_bytes):
+    with pytest.raises(ValueError):
+        records_of(text, chunk_bytes)
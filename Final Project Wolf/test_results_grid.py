@@ -0,0 +1,52 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import exports
+from activity_generator import generate_records
+from activity_table import build_activity_table
+from filter_engine import FilterIndex, row_ids, select_rows
+from results_grid import ResultsGrid
+
+QUERIES = [
+    ({}, None, True),
+    ({}, 'Description', False),
+    ({'Tab': 'assem'}, 'Time', True),
+    ({'Description': 'sketch', 'Tab': 'part'}, 'Tab', False),
+]
+
+
+@pytest.fixture(scope='module')
+def selection():
+    records = generate_records(5000, seed=5)
+    for i in range(0, len(records), 9):
+        del records[i]['Tab']
+    table = build_activity_table(records)
+    index = FilterIndex(table)
+    rows = row_ids(index.mask({'User': 'studenta'}, date(2022, 11, 1), date(2023, 1, 31)))
+    return table, index, rows
+
+
+# The grid over row ids shows what a grid over a copy of those rows showed
+@pytest.mark.parametrize('searches, sort_column, ascending', QUERIES)
+def test_grid_over_row_ids_matches_a_copy(selection, searches, sort_column, ascending):
+    table, index, rows = selection
+    copy_grid = ResultsGrid(select_rows(table, rows))
+    grid = ResultsGrid(table, rows, index)
+
+    expected = copy_grid.rows(searches, sort_column, ascending)
+    found = grid.rows(searches, sort_column, ascending)
+    assert len(grid) == len(rows)
+    assert np.array_equal(found, expected)
+    for page in range(2):
+        pd.testing.assert_frame_equal(grid.page(found, page, 25), copy_grid.page(expected, page, 25),
+                                      check_categorical=False)
+
+
+def test_csv_export_of_row_ids_matches_a_copy(selection):
+    table, _, rows = selection
+
+    assert exports.export_table(table, 'CSV', rows) == exports.export_table(select_rows(table, rows), 'CSV')
+    assert exports.export_table(table, 'CSV', rows[:0]) == exports.export_table(table.iloc[:0], 'CSV')
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import stats_cube
+from aggregation import map_reduce
+from activity_generator import generate_records
+from activity_table import build_activity_table
+
+
+@pytest.fixture(scope='module')
+def table():
+    records = generate_records(3000, seed=6)
+    for i in range(0, len(records), 11):
+        del records[i]['Tab']
+    records[7]['Time'] = 'yesterday'
+    return build_activity_table(records)
+
+
+# A filter that leaves no Creative rows, so one activity type is unobserved
+@pytest.fixture(scope='module', params=['all rows', 'filtered'])
+def rows(request, table):
+    if request.param == 'all rows':
+        return None
+    return np.flatnonzero((table['ActivityType'] != 'Creative').to_numpy())
+
+
+@pytest.fixture(scope='module')
+def frame(table, rows):
+    # The rows the charts were drawn from before the cube
+    selected = table if rows is None else table.iloc[rows]
+    return selected.dropna(subset=['Time'])
+
+
+# Counted in one run and in chunks merged from the process pool
+@pytest.fixture(scope='module', params=[1, 2])
+def cube(request, table, rows):
+    return map_reduce(table, stats_cube.count_cube, stats_cube.merge_cubes, request.param, min_rows=1, rows=rows)
+
+
+def assert_counts_equal(result, expected):
+    pd.testing.assert_series_equal(result, expected, check_dtype=False, check_names=False,
+                                   check_index_type=False, check_categorical=False)
+
+
+def test_activity_category_counts(cube, frame):
+    expected = frame['ActivityType'].value_counts()
+    assert_counts_equal(stats_cube.activity_category_counts(cube), expected[expected > 0])
+
+
+@pytest.mark.parametrize('dimension', ['User', 'Tab'])
+def test_top_counts(cube, frame, dimension):
+    assert_counts_equal(stats_cube.top_counts(cube, dimension), frame[dimension].value_counts().head(10))
+
+
+def test_actions_per_day(cube, frame):
+    expected = frame.groupby(frame['Time'].dt.date)['Description'].count()
+    assert_counts_equal(stats_cube.actions_per_day(cube), expected)
+
+
+def test_activity_types_per_day(cube, frame):
+    expected = frame.groupby([frame['Time'].dt.date, 'ActivityType'], observed=True).size().unstack(fill_value=0)
+    pd.testing.assert_frame_equal(stats_cube.activity_types_per_day(cube), expected, check_dtype=False,
+                                  check_names=False, check_index_type=False, check_column_type=False,
+                                  check_categorical=False)
+
+
+def test_weekday_hour_counts(cube, frame):
+    frame = frame.assign(DayOfWeek=frame['Time'].dt.day_name(), Hour=frame['Time'].dt.hour)
+    expected = frame.pivot_table(index='DayOfWeek', columns='Hour', values='Description', aggfunc='count').fillna(0)
+    pd.testing.assert_frame_equal(stats_cube.weekday_hour_counts(cube), expected, check_dtype=False,
+                                  check_names=False, check_column_type=False)
+
+
+def test_activities_per_user(cube, frame):
+    expected = frame.groupby(['User', 'ActivityType'], observed=True).size().unstack(fill_value=0)
+    pd.testing.assert_frame_equal(stats_cube.activities_per_user(cube), expected, check_dtype=False,
+                                  check_names=False, check_index_type=False, check_column_type=False,
+                                  check_categorical=False)